@@ -1,27 +1,42 @@
 from pathlib import Path
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, _app_ctx_stack
 from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
 from config import Config
+from app.cache import LRUCache, ResponseCache
+from app import database, instrumentation
 
-db = SQLAlchemy()
+
+def app_context_id():
+    # ? One session per app context rather than per thread, so requests served
+    # ? by threads, greenlets or background jobs never share one
+    return id(_app_ctx_stack.top)
+
+
+db = database.RoutingSQLAlchemy(session_options={'scopefunc': app_context_id})
 migrate = Migrate()
 mail = Mail()
 jwt = JWTManager()
 ma = Marshmallow()
+user_cache = LRUCache()
+response_cache = ResponseCache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    database.init_app(app)
+    instrumentation.init_app(app)
     db.init_app(app)
+    database.replicas.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)
     jwt.init_app(app)
     ma.init_app(app)
+    user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    response_cache.init_app(app)
 
     from app.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
@@ -34,4 +49,4 @@ def create_app(config_class=Config):
     return app
 
 
-from app import models, email, utils
\ No newline at end of file
+from app import models, email, utils, fulltext
\ No newline at end of file
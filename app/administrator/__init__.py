@@ -1,9 +1,15 @@
 from werkzeug.exceptions import HTTPException
-from flask import Response, redirect
+from flask import Response, redirect, jsonify
 from flask_basicauth import BasicAuth
-from flask_admin import Admin
+from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib import sqla
-from app import db
+from app import db, lookups, response_cache, user_cache
+from app.api.book import invalidate_book, publisher_ids
+from app.database import pool_stats, replicas
+from app.email import mail_queue
+from app.instrumentation import request_metrics
+from app.passwords import password_hasher
+from app.trending import activity
 from app.models import User, Book, Category, Comment, Community, Genre, Membership, Post, Review, Publish, Strength, Role, Visibility, BookGenre
 
 def init_admin(app):
@@ -17,7 +23,7 @@ def init_admin(app):
                 {'WWW-Authenticate': 'Basic realm="Login Required"'}
             ))
 
-    class ModelView(sqla.ModelView):
+    class AuthMixin:
         def is_accessible(self):
             if not basic_auth.authenticate():
                 raise AuthException('Not authenticated. Refresh the page.')
@@ -27,6 +33,51 @@ def init_admin(app):
         def inaccessible_callback(self, name, **kwargs):
             return redirect(basic_auth.challenge())
 
+    class ModelView(AuthMixin, sqla.ModelView):
+        pass
+
+    class LookupModelView(ModelView):
+        # ? The app.lookups table caching this model's type -> id map
+        lookup = None
+
+        def after_model_change(self, form, model, is_created):
+            self.lookup.refresh()
+            return super().after_model_change(form, model, is_created)
+
+        def after_model_delete(self, model):
+            self.lookup.refresh()
+            return super().after_model_delete(model)
+
+    class MetricsView(AuthMixin, BaseView):
+        @expose('/')
+        def index(self):
+            return jsonify({
+                'database': pool_stats(db.engine),
+                'read_replicas': replicas.stats(),
+                'user_cache': user_cache.stats(),
+                'response_cache': response_cache.backend.stats(),
+                'mail_queue': mail_queue.stats(),
+                'activity': activity.stats(),
+                'password_hasher': password_hasher.stats()
+            })
+
+        @expose('/requests/')
+        def requests(self):
+            # ? Per worker, like the other metrics
+            return jsonify(request_metrics.stats())
+
+    class CommunityLookupModelView(LookupModelView):
+        # ? Visibility and Category rows point at the community they describe,
+        # ? which community_details embeds
+
+        def after_model_change(self, form, model, is_created):
+            response_cache.invalidate('community_details', community_id=model.community_id)
+            return super().after_model_change(form, model, is_created)
+
+        def after_model_delete(self, model):
+            response_cache.invalidate('community_details', community_id=model.community_id)
+            return super().after_model_delete(model)
+
     class UserModelView(ModelView):
         column_list = ('id', 'email', 'name', 'member_since', 'born', 'website', 'social_media', 'is_author', 'avatar')
         # column_exclude_list = ('password_hash', 'bio')
@@ -35,6 +86,31 @@ def init_admin(app):
         def on_model_change(self, form, model, is_created):
             return super().on_model_change(form, model, is_created)
 
+        @staticmethod
+        def published_book_ids(user_id):
+            return [publish.book_id for publish in Publish.query.filter_by(user_id=user_id)]
+
+        @staticmethod
+        def invalidate(user_id, book_ids):
+            user_cache.delete(user_id)
+            response_cache.invalidate('user_lookup', id=user_id)
+            # ? Book details embed the author's profile
+            for book_id in book_ids:
+                response_cache.invalidate('book_details', book_id=book_id)
+
+        def after_model_change(self, form, model, is_created):
+            self.invalidate(model.id, self.published_book_ids(model.id))
+            return super().after_model_change(form, model, is_created)
+
+        def on_model_delete(self, model):
+            # ? The user's publish rows are deleted with them, read them first
+            model._published_book_ids = self.published_book_ids(model.id)
+            return super().on_model_delete(model)
+
+        def after_model_delete(self, model):
+            self.invalidate(model.id, model._published_book_ids)
+            return super().after_model_delete(model)
+
     class BookModelView(ModelView):
         column_list = ('id', 'title', 'description', 'cover')
         # column_exclude_list = ('cover')
@@ -43,7 +119,21 @@ def init_admin(app):
         def on_model_change(self, form, model, is_created):
             return super().on_model_change(form, model, is_created)
 
-    class CategoryModelView(ModelView):
+        def after_model_change(self, form, model, is_created):
+            invalidate_book(model.id)
+            return super().after_model_change(form, model, is_created)
+
+        def on_model_delete(self, model):
+            # ? The book's publish rows are deleted with it, read them first
+            model._publisher_ids = publisher_ids(model.id)
+            return super().on_model_delete(model)
+
+        def after_model_delete(self, model):
+            invalidate_book(model.id, model._publisher_ids)
+            return super().after_model_delete(model)
+
+    class CategoryModelView(CommunityLookupModelView):
+        lookup = lookups.categories
         column_list = ('id', 'type')
         form_excluded_columns = ('community_id')
 
@@ -64,8 +154,17 @@ def init_admin(app):
 
         def on_model_change(self, form, model, is_created):
             return super().on_model_change(form, model, is_created)
+
+        def after_model_change(self, form, model, is_created):
+            response_cache.invalidate('community_details', community_id=model.id)
+            return super().after_model_change(form, model, is_created)
+
+        def after_model_delete(self, model):
+            response_cache.invalidate('community_details', community_id=model.id)
+            return super().after_model_delete(model)
     
-    class GenreModelView(ModelView):
+    class GenreModelView(LookupModelView):
+        lookup = lookups.genres
         column_list = ('id', 'type')
 
         def on_model_change(self, form, model, is_created):
@@ -105,13 +204,15 @@ def init_admin(app):
         def on_model_change(self, form, model, is_created):
             return super().on_model_change(form, model, is_created)
     
-    class RoleModelView(ModelView):
+    class RoleModelView(LookupModelView):
+        lookup = lookups.roles
         column_list = ('id', 'type')
 
         def on_model_change(self, form, model, is_created):
             return super().on_model_change(form, model, is_created)
     
-    class VisibilityModelView(ModelView):
+    class VisibilityModelView(CommunityLookupModelView):
+        lookup = lookups.visibilities
         column_list = ('id', 'type')
 
         def on_model_change(self, form, model, is_created):
@@ -137,4 +238,5 @@ def init_admin(app):
     admin.add_view(PublishModelView(Publish, db.session))
     admin.add_view(StrengthModelView(Strength, db.session))
     admin.add_view(VisibilityModelView(Visibility, db.session))
-    admin.add_view(BookGenreModelView(BookGenre, db.session))
\ No newline at end of file
+    admin.add_view(BookGenreModelView(BookGenre, db.session))
+    admin.add_view(MetricsView(name='Metrics', endpoint='metrics'))
\ No newline at end of file
@@ -1,31 +1,31 @@
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from app.analytics.sentiment import score, score_many
 # from underthesea import sentiment
 # from langdetect import detect
 
 
-class Scores:
-    def __init__(self):
-        self.positive = 0
-        self.negative = 0
-
-
-def analyze(overviews, scores):
-    sia = SentimentIntensityAnalyzer()
-    for overview in overviews:
-        ps = sia.polarity_scores(overview[0])
-        if ps["pos"] > ps["neg"]:
-            scores.positive += 1
-        elif ps["pos"] < ps["neg"]:
-            scores.negative += 1
-        # if detect(overview[0]) == "vi":
-        #     result = sentiment(overview)
-        #     if result == "positive":
-        #         scores.positive += 1
-        #     elif result == "negative":
-        #         scores.negative += 1
-        # else:
-        #     ps = sia.polarity_scores(overview[0])
-        #     if ps["pos"] > ps["neg"]:
-        #         scores.positive += 1
-        #     elif ps["pos"] < ps["neg"]:
-        #         scores.negative += 1
+POSITIVE = 'positive'
+NEGATIVE = 'negative'
+NEUTRAL = 'neutral'
+
+
+def label(ps):
+    if ps["pos"] > ps["neg"]:
+        return POSITIVE
+    elif ps["pos"] < ps["neg"]:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def classify(overview):
+    return label(score(overview))
+    # if detect(overview) == "vi":
+    #     result = sentiment(overview)
+    #     if result == "positive":
+    #         return POSITIVE
+    #     elif result == "negative":
+    #         return NEGATIVE
+    #     return NEUTRAL
+
+
+def classify_many(overviews, processes=0, threshold=2000):
+    return [label(ps) for ps in score_many(overviews, processes, threshold)]
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+
+_analyzer = None
+_analyzer_lock = Lock()
+_pool = None
+_pool_lock = Lock()
+
+
+def get_analyzer():
+    # ? Parse the lexicon once per process. It must already be installed
+    # ? (see nltk.txt), nothing is downloaded at runtime.
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def get_pool(processes):
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=processes, initializer=get_analyzer)
+    return _pool
+
+
+def score(text):
+    return get_analyzer().polarity_scores(text or '')
+
+
+def _score_chunk(texts):
+    sia = get_analyzer()
+    return [sia.polarity_scores(text or '') for text in texts]
+
+
+def score_many(texts, processes=0, threshold=2000):
+    texts = list(texts)
+
+    if processes <= 1 or len(texts) < threshold:
+        return _score_chunk(texts)
+
+    size = -(-len(texts) // (processes * 4))
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    scores = []
+    for chunk in get_pool(processes).map(_score_chunk, chunks):
+        scores.extend(chunk)
+    return scores
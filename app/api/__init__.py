@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('api', __name__)
 
-from app.api import auth, book, community, errors, search, images
\ No newline at end of file
+from app.api import auth, batch, book, community, errors, pagination, search, images
\ No newline at end of file
@@ -1,13 +1,30 @@
 from flask import request, jsonify
-from schema import SchemaError, Schema, And, Use
+from schema import SchemaError
 from flask_jwt_extended import jwt_required, current_user, create_access_token, create_refresh_token
-from app import db, jwt
-from app.models import Genre, Strength, User
+from sqlalchemy.orm import make_transient_to_detached, undefer
+from app import db, jwt, lookups, response_cache, user_cache
+from app.models import Book, Publish, Strength, User
 from app.api import bp
-from app.api.errors import not_found, bad_request
-from app.utils import validate_mail, is_valid_url
+from app.api.batch import get_items, item_result
+from app.api.errors import not_found, bad_request, service_unavailable
+from app.api.pagination import paginate
+from app.passwords import PasswordPoolBusy
+from app.validators import register_schema, login_schema, profile_schemas, user_genre_schema
 from app.schemas import UserSchema
 
+def user_books_page(user):
+    books, next_cursor = paginate(user.publishes, Book.id)
+    return {
+        'books': [b.get_book_info() for b in books],
+        'next_cursor': next_cursor
+    }
+
+
+@bp.errorhandler(PasswordPoolBusy)
+def password_pool_busy(e):
+    return service_unavailable('Too many sign-ins at the moment, try again shortly.')
+
+
 @jwt.user_identity_loader
 def user_identity_lookup(user_id):
     return user_id
@@ -16,30 +33,27 @@ def user_identity_lookup(user_id):
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
     identity = jwt_data["sub"]
-    return User.query.filter_by(id=identity).first()
+    columns = user_cache.get(identity)
+
+    if columns is None:
+        user = User.query.filter_by(id=identity).first()
+
+        if user:
+            user_cache.set(identity, {c.key: getattr(user, c.key) for c in db.inspect(User).column_attrs if not c.deferred})
+
+        return user
+
+    # ? Rebuild the row as if it was just loaded, then attach it without a SELECT
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 
 @bp.route('/users', methods=['POST'])
 def user_register():
     try:
         data = request.get_json()
-        Schema({
-            'email': And(
-                Use(str),
-                lambda e: validate_mail(e),
-                error='Invalid email'
-            ),
-            'password': And(
-                Use(str),
-                lambda p: len(p) >= 6,
-                error='Password must be at least 6 characters'
-            ),
-            'name': And(
-                Use(str),
-                lambda p: len(p) >= 2,
-                error='Name must be at least 2 characters'
-            )
-        }).validate(data)
+        register_schema.validate(data)
         if User.query.filter_by(email=data['email']).first():
             return bad_request('Email is already in used.')
         
@@ -61,20 +75,9 @@ def user_register():
 def user_login():
     try:
         data = request.get_json()
-        Schema({
-            'email': And(
-                Use(str),
-                lambda e: validate_mail(e),
-                error='Invalid email.'
-            ),
-            'password': And(
-                Use(str),
-                lambda e: len(e) >= 6,
-                error='Password must be at least 6 characters.'
-            )
-        }).validate(data)
-
-        user = User.query.filter_by(email=data['email']).first()
+        login_schema.validate(data)
+
+        user = User.query.options(undefer(User.password_hash)).filter_by(email=data['email']).first()
 
         if not user:
             return not_found('User\'s not found.')
@@ -82,6 +85,12 @@ def user_login():
         if not user.check_password(data['password']):
             return bad_request('Wrong password.')
 
+        # ? Upgrade hashes made with an older PASSWORD_HASH_METHOD while the password is at hand
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+            user_cache.delete(user.id)
+
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(user.id)
 
@@ -103,74 +112,52 @@ def user_update():
 
     if 'name' in data:
         try:
-            Schema({
-                'name': And(
-                    Use(str),
-                    lambda e: len(e) >= 2,
-                    error='Name must be at least 2 characters.'
-                ),
-            }).validate({'name': data['name']})
+            profile_schemas['name'].validate({'name': data['name']})
             current_user.name = data['name']
         except SchemaError as e:
             return bad_request(e.errors[-1])
 
     if 'social_media' in data:
         try:
-            Schema({
-                'social_media': And(
-                    Use(str),
-                    lambda e: is_valid_url(e),
-                    error='Social media must be a valid url link.'
-                ),
-            }).validate({ 'social_media': data['social_media']})
+            profile_schemas['social_media'].validate({ 'social_media': data['social_media']})
             current_user.social_media = data['social_media']
         except SchemaError as e:
             return bad_request(e.errors[-1])
 
     if 'bio' in data:
         try:
-            Schema({
-                'bio': And(
-                    Use(str),
-                    lambda e: len(e) <= 250,
-                    error='Bio must not be more than 250 characters.'
-                ),
-            }).validate({'bio': data['bio']})
+            profile_schemas['bio'].validate({'bio': data['bio']})
             current_user.bio = data['bio']
         except SchemaError as e:
             return bad_request(e.errors[-1])
 
     if 'born' in data:
         try:
-            Schema({
-                'born': And(
-                    Use(str),
-                    lambda e: len(e) <= 100,
-                    error='Bio must not be more than 100 characters.'
-                ),
-            }).validate({'born': data['born']})
+            profile_schemas['born'].validate({'born': data['born']})
             current_user.born = data['born']
         except SchemaError as e:
             return bad_request(e.errors[-1])
 
     if 'website' in data:
         try:
-            Schema({
-                'website': And(
-                    Use(str),
-                    lambda e: is_valid_url(e),
-                    error='Website must be a valid url link.'
-                )
-            }).validate({'website': data['website']})
+            profile_schemas['website'].validate({'website': data['website']})
             current_user.website = data['website']
         except SchemaError as e:
             return bad_request(e.errors[-1])
 
     db.session.commit()
+    user_cache.delete(current_user.id)
+    response_cache.invalidate('user_lookup', id=current_user.id)
+
+    # ? Book details embed the author's profile
+    for publish in Publish.query.filter_by(user_id=current_user.id):
+        response_cache.invalidate('book_details', book_id=publish.book_id)
+
     return jsonify(UserSchema().dump(current_user))
 
 
 @bp.route('/users/<id>', methods=['GET'])
+@response_cache.cached('user_lookup')
 def user_lookup(id):
     user = User.query.filter_by(id=id).first()
 
@@ -191,23 +178,17 @@ def user_genres():
 def user_add_genre():
     try:
         data = request.get_json()
-        Schema({
-            'type': And(
-                Use(str),
-                lambda e: len(e) <= 20,
-                error='Type must not be more than 20 characters.'
-            )
-        }).validate(data)
+        user_genre_schema.validate(data)
 
-        genre = Genre.query.filter_by(type=data['type']).first()
+        genre_id = lookups.genres.get(data['type'])
 
-        if not genre:
+        if not genre_id:
             return bad_request('Genre does not exists.')
 
-        if genre in current_user.strength:
+        if Strength.query.filter_by(user_id=current_user.id).filter_by(genre_id=genre_id).first():
             return bad_request(f"User has already added {data['type']}")
         
-        current_user.strength.append(genre)
+        db.session.add(Strength(user_id=current_user.id, genre_id=genre_id))
         db.session.commit()
 
         return jsonify(current_user.get_user_genre()), 201
@@ -215,6 +196,45 @@ def user_add_genre():
         return e.errors[-1]
 
 
+@bp.route('/users/me/genres/batch', methods=['POST'])
+@jwt_required()
+def user_add_genres():
+    types = get_items('types')
+    results = [None] * len(types)
+
+    for i, name in enumerate(types):
+        try:
+            types[i] = user_genre_schema.validate({'type': name})['type']
+        except SchemaError as e:
+            results[i] = item_result(400, e.errors[-1] or 'Invalid item.', type=name)
+
+    genres = lookups.genres.get_many(t for t, r in zip(types, results) if r is None)
+    added = {genre_id for genre_id, in db.session.query(Strength.genre_id)
+             .filter(Strength.user_id == current_user.id, Strength.genre_id.in_(genres.values()))}
+    rows = []
+
+    for i, name in enumerate(types):
+        if results[i]:
+            continue
+
+        genre_id = genres.get(name)
+
+        if genre_id is None:
+            results[i] = item_result(400, 'Genre does not exists.', type=name)
+        elif genre_id in added:
+            results[i] = item_result(400, f"User has already added {name}", type=name)
+        else:
+            added.add(genre_id)
+            rows.append({'user_id': current_user.id, 'genre_id': genre_id})
+            results[i] = item_result(201, id=genre_id, type=name)
+
+    if rows:
+        db.session.execute(Strength.__table__.insert(), rows)
+        db.session.commit()
+
+    return jsonify({'results': results})
+
+
 @bp.route('/users/me/genres/<genre_id>', methods=['DELETE'])
 @jwt_required()
 def user_remove_genre(genre_id):
@@ -232,15 +252,16 @@ def user_remove_genre(genre_id):
 @bp.route('/users/me/books', methods=['GET'])
 @jwt_required()
 def get_user_books():
-    return jsonify(current_user.get_user_books())
+    return jsonify(user_books_page(current_user))
 
 
 @bp.route('/users/<id>/books', methods=['GET'])
 @jwt_required()
+@response_cache.cached('get_user_books_by_id')
 def get_user_books_by_id(id):
     user = User.query.filter_by(id=id).first()
 
     if not user:
         return not_found("User's not found.")
 
-    return jsonify(user.get_user_books())
\ No newline at end of file
+    return jsonify(user_books_page(user))
\ No newline at end of file
@@ -0,0 +1,35 @@
+from flask import request, current_app
+from app.api import bp
+from app.api.errors import bad_request
+
+
+class BatchError(Exception):
+    pass
+
+
+@bp.errorhandler(BatchError)
+def batch_error(e):
+    return bad_request(str(e))
+
+
+def get_items(key):
+    """Return the list of items posted to a /batch endpoint under key."""
+    data = request.get_json()
+
+    if not isinstance(data, dict) or not isinstance(data.get(key), list) or not data[key]:
+        raise BatchError(f'{key.capitalize()} must be a non-empty list.')
+
+    if len(data[key]) > current_app.config['MAX_BATCH_SIZE']:
+        raise BatchError(f"Batches must not have more than {current_app.config['MAX_BATCH_SIZE']} items.")
+
+    return data[key]
+
+
+def item_result(status, message=None, **fields):
+    """Outcome of one item, reported in the order the items were posted."""
+    result = {'status': status, **fields}
+
+    if message:
+        result['message'] = message
+
+    return result
@@ -1,23 +1,43 @@
 import base64
-from uuid import uuid4
-import os
-import nltk
 from werkzeug.utils import secure_filename
-from schema import Schema, SchemaError, And, Use
+from schema import SchemaError
 from flask import request, jsonify, current_app
 from flask_jwt_extended import current_user, jwt_required
-from sqlalchemy.sql.functions import func
-from threading import Thread
-from app import db
+from app import db, lookups, response_cache
 from app.api import bp
+from app.api.batch import get_items, item_result
 from app.api.errors import bad_request, forbidden, not_found
-from app.models import Book, BookGenre, Genre, Publish, Review, User
+from app.api.pagination import paginate
+from app.images import save_cover, delete_cover
+from app.models import Book, BookActivity, BookGenre, BookStats, BookTrending, Publish, Review, User
 from app.schemas import BookSchema, ReviewSchema
-from app.utils import validate_date, is_allowed_file
-from app.analytics.reviews import analyze, Scores
+from app.serializers import book_projection, json_response, review_query
+from app.utils import parse_date, is_allowed_file
+from app.validators import book_genre_schema, review_schema
+from app.analytics.reviews import classify, classify_many
+from app.trending import activity, counts_views
 
 
-nltk.download('vader_lexicon')
+def publisher_ids(book_id):
+    return [publish.user_id for publish in Publish.query.filter_by(book_id=book_id)]
+
+
+def invalidate_book(book_id, publishers=None):
+    """Drop the cached responses showing the book. Pass the publishers read
+    before deleting it, its publish rows are gone afterwards."""
+    response_cache.invalidate('book_details', book_id=book_id)
+    response_cache.invalidate('book_genre_list', book_id=book_id)
+
+    for user_id in publisher_ids(book_id) if publishers is None else publishers:
+        response_cache.invalidate('get_user_books_by_id', id=user_id)
+
+
+def book_reviews_page(book):
+    reviews, next_cursor = paginate(review_query().filter(Review.book_id == book.id), Review.id)
+    return {
+        'reviews': [Review.get_review_info(r) for r in reviews],
+        'next_cursor': next_cursor
+    }
 
 
 @bp.route('/books', methods=['POST'])
@@ -36,15 +56,15 @@ def book_creation():
     if not cover or not is_allowed_file(cover.filename):
         return bad_request('Image formats allow: jpg, jpeg, png.')
 
-    extension = cover.filename.rsplit('.', 1)[-1]
-    unique_name = uuid4().hex
-    filename = f'{unique_name}.{extension}'
-    cover.save(os.path.join(current_app.config['IMAGE_FOLDER_DIR'], filename))
+    filename = save_cover(cover)
 
     book = Book(title=title, description=description, cover=f'/api/images/{filename}')
     current_user.publishes.append(book)
     db.session.add(book)
+    db.session.flush()
+    db.session.add(BookStats(book_id=book.id))
     db.session.commit()
+    response_cache.invalidate('get_user_books_by_id', id=current_user.id)
 
     return jsonify(book.get_book_info()), 201
 
@@ -52,33 +72,32 @@ def book_creation():
 @bp.route('/books/<book_id>/statistics', methods=['GET'])
 @jwt_required()
 def book_statistics(book_id):
-    if len(Review.query.filter_by(book_id=book_id).all()) == 0:
-        return jsonify({
-        "avg_star": 0,
-        "avg_duration_to_finish": 0,
-        "positive": 0,
-        "negative": 0
-    })
+    stats = BookStats.query.get(book_id)
 
-    avg_star = db.session.query(func.avg(Review.star)).filter(Review.book_id == book_id).first()[0]
-    avg_duration_to_finish = db.session.query(func.avg(Review.finished - Review.started)).filter(Review.book_id == book_id).first()[0]
+    if not stats:
+        stats = BookStats(book_id=book_id)
 
-    scores = Scores()
-    overviews = db.session.query(Review.overview).filter(Review.book_id == book_id).all()    
-    t = Thread(target=analyze, args=(overviews, scores))
-    t.start()
-    t.join()
-    
-    return jsonify({
-        "avg_star": float(round(avg_star, 1)),
-        "avg_duration_to_finish": int(round(avg_duration_to_finish)),
-        "positive": scores.positive,
-        "negative": scores.negative
+    return jsonify(stats.get_statistics_info())
+
+
+@bp.route('/books/trending', methods=['GET'])
+@jwt_required()
+@response_cache.cached('book_trending')
+def book_trending():
+    rows = db.session.query(*book_projection.columns, BookTrending.score) \
+        .join(BookTrending, BookTrending.book_id == Book.id) \
+        .order_by(BookTrending.rank) \
+        .all()
+
+    return json_response({
+        'books': [dict(book_projection.load(row), score=round(row[-1], 2)) for row in rows]
     })
 
 
 @bp.route('/books/<book_id>', methods=['GET'])
 @jwt_required()
+@counts_views
+@response_cache.cached('book_details')
 def book_details(book_id):
     book = Book.query.filter_by(id=book_id).first()
 
@@ -123,21 +142,15 @@ def book_update(book_id):
         if not is_allowed_file(cover.filename):
             return bad_request('Image formats allow: jpg, jpeg, png.')
 
-        # ? Delete old image in filesystem
-        filename = book.cover.rsplit('/', 1)[-1]
-        # path_to_file = f"{current_app.config['IMAGE_FOLDER_DIR']}\\{filename}"
-        path_to_file = f"{current_app.config['IMAGE_FOLDER_DIR']}/{filename}"
-        if os.path.exists(path_to_file):
-            os.remove(path_to_file)
+        # ? Delete old image and its variants in filesystem
+        delete_cover(book.cover.rsplit('/', 1)[-1])
 
         #? Create new image and link to Book
-        extension = cover.filename.rsplit('.', 1)[-1]
-        unique_name = uuid4().hex
-        filename = f'{unique_name}.{extension}'
-        cover.save(os.path.join(current_app.config['IMAGE_FOLDER_DIR'], filename))
+        filename = save_cover(cover)
         book.cover = f'/api/images/{filename}'
 
     db.session.commit()
+    invalidate_book(book.id)
 
     return jsonify(book.get_book_info())
 
@@ -155,18 +168,22 @@ def book_deletion(book_id):
     if not publish:
         return forbidden("User cannot delete this book.")
 
-    filename = book.cover.rsplit('/', 1)[-1]
-    # path_to_file = f"{current_app.config['IMAGE_FOLDER_DIR']}\\{filename}"
-    path_to_file = f"{current_app.config['IMAGE_FOLDER_DIR']}/{filename}"
-    if os.path.exists(path_to_file):
-        os.remove(path_to_file)
+    cover = book.cover.rsplit('/', 1)[-1]
+    publishers = publisher_ids(book.id)
 
+    # ? One transaction, the flush orders the deletes by foreign key
     db.session.delete(publish)
-    db.session.commit()
-    
+    BookStats.query.filter_by(book_id=book.id).delete()
+    BookActivity.query.filter_by(book_id=book.id).delete()
+    BookTrending.query.filter_by(book_id=book.id).delete()
     db.session.delete(book)
     db.session.commit()
 
+    # ? Only once the rows are gone, so a failed commit leaves the book intact
+    # ? and a concurrent read can't cache it again
+    invalidate_book(book.id, publishers)
+    delete_cover(cover)
+
     return jsonify({'message': 'Book deleted successfully.'})
 
 
@@ -181,30 +198,75 @@ def book_add_genre(book_id):
 
         data = request.get_json()
 
-        Schema({
-            'type': And(
-                Use(str),
-                lambda e: len(e) <= 20,
-                error='Genre type must not be more than 20 characters.'
-            )
-        }).validate(data)
+        book_genre_schema.validate(data)
 
-        genre = Genre.query.filter_by(type=data['type']).first()
+        genre_id = lookups.genres.get(data['type'])
 
-        if not genre:
+        if not genre_id:
             return not_found('Genre\'s not found.')
 
-        book.genres.append(genre)
+        if BookGenre.query.filter_by(book_id=book.id).filter_by(genre_id=genre_id).first():
+            return bad_request(f"Book has already added {data['type']}")
+
+        db.session.add(BookGenre(book_id=book.id, genre_id=genre_id))
 
         db.session.commit()
+        response_cache.invalidate('book_genre_list', book_id=book.id)
 
         return jsonify(book.get_book_genre()), 201
     except SchemaError as e:
         return bad_request(e.errors[-1])
 
 
+@bp.route('/books/<book_id>/genres/batch', methods=['POST'])
+@jwt_required()
+def book_add_genres(book_id):
+    book = Book.query.filter_by(id=book_id).first()
+
+    if not book:
+        return not_found('Book\'s not found.')
+
+    types = get_items('types')
+    results = [None] * len(types)
+
+    for i, name in enumerate(types):
+        try:
+            types[i] = book_genre_schema.validate({'type': name})['type']
+        except SchemaError as e:
+            results[i] = item_result(400, e.errors[-1] or 'Invalid item.', type=name)
+
+    # ? One IN query for the genres the book already has
+    genres = lookups.genres.get_many(t for t, r in zip(types, results) if r is None)
+    added = {genre_id for genre_id, in db.session.query(BookGenre.genre_id)
+             .filter(BookGenre.book_id == book.id, BookGenre.genre_id.in_(genres.values()))}
+    rows = []
+
+    for i, name in enumerate(types):
+        if results[i]:
+            continue
+
+        genre_id = genres.get(name)
+
+        if genre_id is None:
+            results[i] = item_result(404, 'Genre\'s not found.', type=name)
+        elif genre_id in added:
+            results[i] = item_result(400, f"Book has already added {name}", type=name)
+        else:
+            added.add(genre_id)
+            rows.append({'book_id': book.id, 'genre_id': genre_id})
+            results[i] = item_result(201, id=genre_id, type=name)
+
+    if rows:
+        db.session.execute(BookGenre.__table__.insert(), rows)
+        db.session.commit()
+        response_cache.invalidate('book_genre_list', book_id=book.id)
+
+    return jsonify({'results': results})
+
+
 @bp.route('/books/<book_id>/genres', methods=['GET'])
 @jwt_required()
+@response_cache.cached('book_genre_list')
 def book_genre_list(book_id):
     book = Book.query.filter_by(id=book_id).first()
 
@@ -229,6 +291,7 @@ def book_genre_deletion(book_id, genre_id):
 
     db.session.delete(book_genre)
     db.session.commit()
+    response_cache.invalidate('book_genre_list', book_id=book.id)
 
     return jsonify(book.get_book_genre())
 
@@ -243,29 +306,7 @@ def book_add_review(book_id):
         if not book:
             return not_found('Book\'s not found.')
 
-        Schema({
-            'content': Use(str),
-            'overview': And(
-                Use(str),
-                lambda e: len(e) <= 50,
-                error='Overview must not be over 50 characters.'
-            ),
-            'star': And(
-                Use(int),
-                lambda e: e <= 5 and e >= 0,
-                error='Star must be in between 0 to 5 stars.'
-            ),
-            'started': And(
-                Use(str),
-                lambda e: validate_date(e),
-                error='Invalid starting date.'
-            ),
-            'finished': And(
-                Use(str),
-                lambda e: validate_date(e),
-                error='Invalid finishing date.'
-            )
-        }).validate(data)
+        review_schema.validate(data)
 
         review = Review(
             user_id=current_user.id,
@@ -273,18 +314,76 @@ def book_add_review(book_id):
             overview=data['overview'],
             content=data['content'],
             star=data['star'],
-            started=data['started'],
-            finished=data['finished']
+            started=parse_date(data['started']),
+            finished=parse_date(data['finished']),
+            sentiment=classify(data['overview'])
         )
 
         book.reviews.append(review)
+        BookStats.apply(book.id, after=BookStats.contribution(review))
         db.session.commit()
+        activity.record(book.id, reviews=1)
 
         return jsonify(ReviewSchema().dump(review)), 201
     except SchemaError as e:
         return bad_request(e.errors[-1])
 
 
+@bp.route('/books/<book_id>/reviews/batch', methods=['POST'])
+@jwt_required()
+def book_add_reviews(book_id):
+    book = Book.query.filter_by(id=book_id).first()
+
+    if not book:
+        return not_found('Book\'s not found.')
+
+    items = get_items('reviews')
+    results = [None] * len(items)
+    reviews = []
+
+    for i, item in enumerate(items):
+        try:
+            data = review_schema.validate(item)
+        except SchemaError as e:
+            results[i] = item_result(400, e.errors[-1] or 'Invalid item.')
+            continue
+
+        reviews.append((i, Review(
+            user_id=current_user.id,
+            book_id=book.id,
+            overview=data['overview'],
+            content=data['content'],
+            star=data['star'],
+            started=parse_date(data['started']),
+            finished=parse_date(data['finished'])
+        )))
+
+    if reviews:
+        sentiments = classify_many(
+            [review.overview for _, review in reviews],
+            processes=current_app.config['SENTIMENT_PROCESSES'],
+            threshold=current_app.config['SENTIMENT_POOL_THRESHOLD']
+        )
+        total = dict.fromkeys(BookStats.COUNTERS, 0)
+
+        for (i, review), sentiment in zip(reviews, sentiments):
+            review.sentiment = sentiment
+            for counter, value in BookStats.contribution(review).items():
+                total[counter] += value
+            results[i] = item_result(201, sentiment=sentiment)
+
+        # ? Reviews are not in the session, they only carry the values to insert
+        db.session.execute(Review.__table__.insert(), [
+            {c.key: getattr(review, c.key) for c in Review.__table__.columns if c.key != 'id'}
+            for _, review in reviews
+        ])
+        BookStats.apply(book.id, after=total)
+        db.session.commit()
+        activity.record(book.id, reviews=len(reviews))
+
+    return jsonify({'results': results})
+
+
 @bp.route('/books/<book_id>/reviews', methods=['GET'])
 @jwt_required()
 def book_reviews(book_id):
@@ -293,7 +392,7 @@ def book_reviews(book_id):
     if not book:
         return not_found('Book\'s not found.')
 
-    return jsonify(book.get_book_reviews())
+    return jsonify(book_reviews_page(book))
 
 
 @bp.route('/books/<book_id>/reviews/<review_id>', methods=['PUT'])
@@ -307,44 +406,27 @@ def book_update_review(book_id, review_id):
         if not book:
             return not_found('Book\'s not found.')
 
-        Schema({
-            'content': Use(str),
-            'overview': And(
-                Use(str),
-                lambda e: len(e) <= 50,
-                error='Overview must not be over 50 characters.'
-            ),
-            'star': And(
-                Use(int),
-                lambda e: e <= 5 and e >= 0,
-                error='Star must be in between 0 to 5 stars.'
-            ),
-            'started': And(
-                Use(str),
-                lambda e: validate_date(e),
-                error='Invalid starting date.'
-            ),
-            'finished': And(
-                Use(str),
-                lambda e: validate_date(e),
-                error='Invalid finishing date.'
-            )
-        }).validate(data)
+        review_schema.validate(data)
 
         review = Review.query.filter_by(id=review_id).first()
 
         if not review:
             return not_found('Review\'s not found.')
 
-        review.overview=data['overview'],
-        review.content=data['content'],
-        review.star=data['star'],
-        review.started=data['started'],
-        review.finished=data['finished']
+        before = BookStats.contribution(review)
+
+        review.overview = data['overview']
+        review.content = data['content']
+        review.star = data['star']
+        review.started = parse_date(data['started'])
+        review.finished = parse_date(data['finished'])
+        review.sentiment = classify(data['overview'])
+
+        BookStats.apply(review.book_id, before=before, after=BookStats.contribution(review))
 
         db.session.commit()
 
-        return jsonify(book.get_book_reviews()), 201
+        return jsonify(book_reviews_page(book)), 201
     except SchemaError as e:
         return bad_request(e.errors[-1])
 
@@ -362,7 +444,8 @@ def book_review_deletion(book_id, review_id):
     if not review:
         return not_found('Review\'s not found.')
 
+    BookStats.apply(review.book_id, before=BookStats.contribution(review))
     db.session.delete(review)
     db.session.commit()
 
-    return jsonify(book.get_book_reviews())
\ No newline at end of file
+    return jsonify(book_reviews_page(book))
\ No newline at end of file
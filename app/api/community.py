@@ -1,12 +1,40 @@
 from flask_jwt_extended.view_decorators import jwt_required
-from schema import Schema, SchemaError, And, Use
+from schema import SchemaError
 from flask import request, jsonify, current_app
 from flask_jwt_extended import current_user
-from app import db
-from app.models import Community, Membership, Post, Comment, Role, Visibility, Category, User
+from sqlalchemy.orm import selectinload
+from app import db, lookups, response_cache
+from app.models import Community, Membership, Post, Comment, Visibility, Category, User
 from app.schemas import CommunitySchema, MembershipSchema, PostSchema, CommentSchema
 from app.api import bp
+from app.api.batch import get_items, item_result
 from app.api.errors import bad_request, forbidden, not_found
+from app.api.pagination import paginate
+from app.serializers import membership_projection, membership_query, post_query, comment_query, json_response
+from app.validators import community_schema, post_schema, comment_schema, member_schema, member_role_schema
+
+
+# ? Eager-loading plan for everything CommunitySchema touches
+community_plan = (
+    selectinload(Community.visibility),
+    selectinload(Community.category)
+)
+
+
+def community_posts_page(community):
+    posts, next_cursor = paginate(post_query().filter(Post.community_id == community.id), Post.id)
+    return {
+        'posts': [Post.get_post_info(p) for p in posts],
+        'next_cursor': next_cursor
+    }
+
+
+def post_comments_page(post):
+    comments, next_cursor = paginate(comment_query().filter(Comment.post_id == post.id), Comment.id)
+    return {
+        'comments': [Comment.get_comment_info(c) for c in comments],
+        'next_cursor': next_cursor
+    }
 
 
 @bp.route('/communities', methods=['POST'])
@@ -15,63 +43,44 @@ def community_creation():
     try:
         data = request.get_json()
 
-        Schema({
-            'name': And(
-                Use(str),
-                lambda e: len(e) >= 5 and len(e) <= 100,
-                error='Community name must be between 5 and 100 characters.'
-            ),
-            'description': And(
-                Use(str),
-                lambda e: len(e) <= 100,
-                error='Description must not be more than 100 characters.'
-            ),
-            'restrict_posting': And(
-                Use(bool),
-                error='Restrict posting must be a boolean.'
-            ),
-            'visibility': Use(str),
-            'category': Use(str)
-        }).validate(data)
+        community_schema.validate(data)
 
         if Community.query.filter_by(name=data['name']).first():
             return bad_request('Community name is already taken.')
         
-        visibility = Visibility.query.filter_by(type=data['visibility']).first()
+        visibility_id = lookups.visibilities.get(data['visibility'])
 
-        if not visibility:
+        if not visibility_id:
             return not_found("Visibility type's not found.")
 
-        category = Category.query.filter_by(type=data['category']).first()
+        category_id = lookups.categories.get(data['category'])
 
-        if not category:
+        if not category_id:
             return not_found("Category type's not found.")
 
         community = Community(
             name=data['name'],
             description=data['description'],
-            restrict_posting=data['restrict_posting'],
-            visibility=visibility,
-            category=category
+            restrict_posting=data['restrict_posting']
         )
 
         db.session.add(community)
-        db.session.commit()
+        # ? Flush for the id, the community and its creator commit together
+        db.session.flush()
+
+        # ? The visibility and category rows hold the link to their community
+        Visibility.query.filter_by(id=visibility_id).update({'community_id': community.id}, synchronize_session=False)
+        Category.query.filter_by(id=category_id).update({'community_id': community.id}, synchronize_session=False)
 
-        creator = Role.query.filter_by(type='Creator').first()
-        
         membership = Membership(
             user_id=current_user.id,
             community_id=community.id,
-            role_id=creator.id
+            role_id=lookups.roles.get('Creator')
         )
 
         db.session.add(membership)
         db.session.commit()
 
-        community.members.append(membership)
-        db.session.commit()
-
         return jsonify(CommunitySchema().dump(community)), 201
     except SchemaError as e:
         return bad_request(e.errors[-1])
@@ -79,8 +88,9 @@ def community_creation():
 
 @bp.route('/communities/<community_id>', methods=['GET'])
 @jwt_required()
+@response_cache.cached('community_details')
 def community_details(community_id):
-    community = Community.query.filter_by(id=community_id).first()
+    community = Community.query.options(*community_plan).filter_by(id=community_id).first()
 
     if not community:
         return not_found("Community's not found.")
@@ -91,8 +101,14 @@ def community_details(community_id):
 @bp.route('/communities/joined', methods=['GET'])
 @jwt_required()
 def communities_joined():
-    communities_joined = Membership.query.filter_by(user_id=current_user.id).all()
-    return jsonify(MembershipSchema(many=True).dump(communities_joined))
+    communities_joined, next_cursor = paginate(
+        membership_query().filter(Membership.user_id == current_user.id),
+        Membership.id
+    )
+    return json_response({
+        'communities': membership_projection.load_many(communities_joined),
+        'next_cursor': next_cursor
+    })
 
 
 @bp.route('/communities/<community_id>/posts', methods=['POST'])
@@ -106,16 +122,7 @@ def community_create_post(community_id):
         if not community:
             return not_found("Commnunity's not found.")
 
-        Schema({
-            'content': And(
-                Use(str),
-                error='Content must be text.'
-            ),
-            'turn_off_commenting': And(
-                Use(bool),
-                error='Commenting option must be a boolean.'
-            )
-        }).validate(data)
+        post_schema.validate(data)
 
         post = Post(
             content=data['content'],
@@ -141,7 +148,7 @@ def community_posts(community_id):
     if not community:
         return not_found("Commnunity's not found.")
 
-    return jsonify(community.get_community_posts())
+    return jsonify(community_posts_page(community))
 
 
 @bp.route('/communities/<community_id>/posts/<post_id>', methods=['PUT'])
@@ -155,16 +162,7 @@ def community_edit_post(community_id, post_id):
         if not community:
             return not_found("Commnunity's not found.")
 
-        Schema({
-            'content': And(
-                Use(str),
-                error='Content must be text.'
-            ),
-            'turn_off_commenting': And(
-                Use(bool),
-                error='Commenting option must be a boolean.'
-            )
-        }).validate(data)
+        post_schema.validate(data)
 
         post = Post.query.filter_by(id=post_id).first()
 
@@ -194,12 +192,11 @@ def community_delete_post(community_id, post_id):
     if not post:
         return not_found("Post's not found.")
 
-    Comment.query.filter_by(post_id=post_id).delete()
-    community.posts.remove(post)
+    Comment.query.filter_by(post_id=post.id).delete()
     db.session.delete(post)
     db.session.commit()
 
-    return jsonify(community.get_community_posts())
+    return jsonify(community_posts_page(community))
 
 
 @bp.route('/communities/<community_id>/posts/<post_id>/comments', methods=['POST'])
@@ -218,12 +215,7 @@ def community_comment_creation(community_id, post_id):
         if not post:
             return not_found("Post's not found.")
 
-        Schema({
-            'content': And(
-                Use(str),
-                error='Comment content must be text.'
-            )
-        }).validate(data)
+        comment_schema.validate(data)
 
         comment = Comment(
             user_id=current_user.id,
@@ -253,7 +245,7 @@ def community_post_comments(community_id, post_id):
     if not post:
         return not_found("Post's not found.")
 
-    return jsonify(post.get_post_comments())
+    return jsonify(post_comments_page(post))
 
 
 @bp.route('/communities/<community_id>/posts/<post_id>/comments/<comment_id>', methods=['PUT'])
@@ -272,12 +264,7 @@ def community_edit_post_comment(community_id, post_id, comment_id):
         if not post:
             return not_found("Post's not found.")
 
-        Schema({
-            'content': And(
-                Use(str),
-                error='Comment content must be text.'
-            )
-        }).validate(data)
+        comment_schema.validate(data)
 
         comment = Comment.query.filter_by(id=comment_id).first()
 
@@ -315,7 +302,7 @@ def community_delete_post_comment(community_id, post_id, comment_id):
     db.session.delete(comment)
     db.session.commit()
 
-    return jsonify(post.get_post_comments())
+    return jsonify(post_comments_page(post))
 
 
 @bp.route('/communities/<community_id>/members', methods=['GET'])
@@ -326,9 +313,15 @@ def community_member_list(community_id):
     if not community:
         return not_found("Commnunity's not found.")
 
-    members = Membership.query.filter_by(community_id=community_id).all()
+    members, next_cursor = paginate(
+        membership_query().filter(Membership.community_id == community_id),
+        Membership.id
+    )
 
-    return jsonify(MembershipSchema(many=True).dump(members))
+    return json_response({
+        'members': membership_projection.load_many(members),
+        'next_cursor': next_cursor
+    })
 
 
 @bp.route('/communities/<community_id>/members', methods=['POST'])
@@ -345,35 +338,29 @@ def community_add_member(community_id):
         if not role_giver:
             return not_found("Current user is not a member of this community.")
 
-        if role_giver.role.type == 'Member':
+        if role_giver.role_id == lookups.roles.get('Member'):
             return forbidden('User cannot add member to community.')
 
         data = request.get_json()
 
-        Schema({
-            'user_id': And(
-                Use(int),
-                error='User_id must be an integer.'
-            ),
-            'role': And(
-                Use(str),
-                error='Must be a valid role.'
-            )
-        }).validate(data)
+        member_schema.validate(data)
 
         user = User.query.filter_by(id=data['user_id']).first()
 
         if not user:
             return not_found("Invalid user_id.")
 
-        role = Role.query.filter_by(type=data['role']).first()
+        role_id = lookups.roles.get(data['role'])
 
-        if not role or role.type == 'Creator':
+        if not role_id or data['role'] == 'Creator':
             return not_found("Invalid role type.")
 
+        if Membership.query.filter_by(user_id=user.id).filter_by(community_id=community_id).first():
+            return bad_request("User is already a member of this community.")
+
         new_member = Membership(
             user_id=data['user_id'],
-            role_id=role.id,
+            role_id=role_id,
             community_id=community_id
         )
 
@@ -385,6 +372,61 @@ def community_add_member(community_id):
         return bad_request(e.errors[-1])
 
 
+@bp.route('/communities/<community_id>/members/batch', methods=['POST'])
+@jwt_required()
+def community_add_members(community_id):
+    community = Community.query.filter_by(id=community_id).first()
+
+    if not community:
+        return not_found("Commnunity's not found.")
+
+    role_giver = Membership.query.filter_by(user_id=current_user.id).filter_by(community_id=community.id).first()
+
+    if not role_giver:
+        return not_found("Current user is not a member of this community.")
+
+    if role_giver.role_id == lookups.roles.get('Member'):
+        return forbidden('User cannot add member to community.')
+
+    items = get_items('members')
+    results = [None] * len(items)
+
+    for i, item in enumerate(items):
+        try:
+            items[i] = member_schema.validate(item)
+        except SchemaError as e:
+            results[i] = item_result(400, e.errors[-1] or 'Invalid item.')
+
+    # ? Resolve every user and existing membership with one IN query each
+    valid = [item for item, r in zip(items, results) if r is None]
+    users = {user_id for user_id, in db.session.query(User.id).filter(User.id.in_([m['user_id'] for m in valid]))}
+    roles = lookups.roles.get_many(m['role'] for m in valid)
+    members = {user_id for user_id, in db.session.query(Membership.user_id)
+               .filter(Membership.community_id == community.id, Membership.user_id.in_(users))}
+    rows = []
+
+    for i, item in enumerate(items):
+        if results[i]:
+            continue
+
+        if item['user_id'] not in users:
+            results[i] = item_result(404, "Invalid user_id.", user_id=item['user_id'])
+        elif item['role'] not in roles or item['role'] == 'Creator':
+            results[i] = item_result(404, "Invalid role type.", user_id=item['user_id'])
+        elif item['user_id'] in members:
+            results[i] = item_result(400, "User is already a member of this community.", user_id=item['user_id'])
+        else:
+            members.add(item['user_id'])
+            rows.append({'user_id': item['user_id'], 'role_id': roles[item['role']], 'community_id': community.id})
+            results[i] = item_result(201, user_id=item['user_id'], role=item['role'])
+
+    if rows:
+        db.session.execute(Membership.__table__.insert(), rows)
+        db.session.commit()
+
+    return jsonify({'results': results})
+
+
 @bp.route('/communities/<community_id>/members/<user_id>/roles', methods=['PUT'])
 @jwt_required()
 def community_update_member_role(community_id, user_id):
@@ -399,30 +441,24 @@ def community_update_member_role(community_id, user_id):
         if not role_giver:
             return not_found("Current user is not a member of this community.")
 
-        if role_giver.role.type == 'Member':
+        if role_giver.role_id == lookups.roles.get('Member'):
             return forbidden('User cannot add member to community.')
 
         data = request.get_json()
 
-        Schema({
-            'role': And(
-                Use(str),
-                error='Must be a valid role.'
-            )
-        }).validate(data)
+        member_role_schema.validate(data)
 
         user = User.query.filter_by(id=user_id).first()
 
         if not user:
             return not_found("Invalid user_id.")
 
-        role = Role.query.filter_by(type=data['role']).first()
-        if not role or role.type == 'Creator':
+        role_id = lookups.roles.get(data['role'])
+        if not role_id or data['role'] == 'Creator':
             return not_found("Invalid role type.")
 
         member = Membership.query.filter_by(user_id=user_id).filter_by(community_id=community_id).first()
-        member.role_id = role.id
-        member.role = role
+        member.role_id = role_id
         
         db.session.commit()
 
@@ -444,7 +480,7 @@ def community_delete_member(community_id, user_id):
     if not role_giver:
         return not_found("Current user is not a member of this community.")
 
-    if role_giver.role.type == 'Member':
+    if role_giver.role_id == lookups.roles.get('Member'):
         return forbidden('User cannot add member to community.')
 
     user = User.query.filter_by(id=user_id).first()
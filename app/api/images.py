@@ -1,7 +1,38 @@
-from flask import current_app, send_file
+import os
+from flask import current_app, request, send_from_directory
 from app.api import bp
+from app.api.errors import bad_request
+from app.images import SIZES, variant_name
 
 @bp.route('/images/<filename>')
 def get_image(filename):
-    # return send_file(f"{current_app.config['IMAGE_FOLDER_DIR']}\\{filename}", as_attachment=True, attachment_filename=filename)
-    return send_file(f"{current_app.config['IMAGE_FOLDER_DIR']}/{filename}", as_attachment=True, attachment_filename=filename)
\ No newline at end of file
+    size = request.args.get('size', 'original')
+
+    if size != 'original' and size not in SIZES:
+        return bad_request(f"Size must be one of: original, {', '.join(SIZES)}.")
+
+    name = variant_name(filename, size)
+    immutable = True
+
+    # ? Variants are generated in the background, serve the original until they
+    # ? exist, without letting clients pin it to the variant URL
+    if not os.path.exists(os.path.join(current_app.config['IMAGE_FOLDER_DIR'], name)):
+        name = filename
+        immutable = False
+
+    # ? Cover names are random per upload so the name is a strong validator. Range
+    # ? and If-None-Match are answered by the conditional response, and the file
+    # ? goes through wsgi.file_wrapper (sendfile under gunicorn) or X-Sendfile.
+    response = send_from_directory(
+        current_app.config['IMAGE_FOLDER_DIR'],
+        name,
+        as_attachment=True,
+        attachment_filename=name,
+        conditional=True,
+        etag=name,
+        max_age=current_app.config['IMAGE_CACHE_MAX_AGE'] if immutable else 0
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = immutable
+
+    return response
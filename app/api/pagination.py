@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from flask import request, current_app
+from sqlalchemy import and_, or_
+from app.api import bp
+from app.api.errors import bad_request
+
+
+class PaginationError(Exception):
+    pass
+
+
+@bp.errorhandler(PaginationError)
+def pagination_error(e):
+    return bad_request(str(e))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise PaginationError('Invalid cursor.')
+
+
+def paginate(query, key, rank=None):
+    """Return one page of query and the cursor of the next one, or None on the last page.
+
+    Rows are ordered by the unique key ascending, or by rank descending then key
+    when a relevance expression is given. The page size comes from the `limit`
+    argument and the position from the opaque `cursor` argument.
+
+    Items are entities for an entity query, and rows for a query over several
+    columns (see app.serializers), in which case the keys trail each row.
+    """
+    limit = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+
+    if limit < 1:
+        raise PaginationError('Limit must be a positive integer.')
+
+    limit = min(limit, current_app.config['MAX_PAGE_SIZE'])
+    keys = [key] if rank is None else [rank, key]
+    cursor = request.args.get('cursor')
+
+    if cursor:
+        values = decode_cursor(cursor)
+
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise PaginationError('Invalid cursor.')
+
+        # ? The key is always an integer id and the rank a number, bool being an int does not count
+        types = [int] if rank is None else [(int, float), int]
+        if any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(values, types)):
+            raise PaginationError('Invalid cursor.')
+
+        if rank is None:
+            query = query.filter(key > values[0])
+        else:
+            query = query.filter(or_(rank < values[0], and_(rank == values[0], key > values[1])))
+
+    width = len(query.column_descriptions)
+    order = [key] if rank is None else [rank.desc(), key]
+    rows = query.add_columns(*keys).order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+
+    if width > 1:
+        return rows, next_cursor
+
+    return [row[0] for row in rows], next_cursor
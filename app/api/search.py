@@ -1,10 +1,11 @@
-from sqlalchemy import or_, and_
 from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, current_user
 from app.api import bp
 from app.api.errors import bad_request, not_found
+from app.api.pagination import paginate
+from app.fulltext import search
 from app.models import User, Book, Community
-from app.schemas import UserSchema, BookSchema, CommunitySchema
+from app.serializers import user_projection, book_projection, community_projection, with_community, json_response
 
 
 @bp.route('/search/users', methods=['GET'])
@@ -15,9 +16,13 @@ def search_users():
     if not query:
         return bad_request('Search query must have value.')
 
-    users = User.query.filter(or_(User.name.ilike(f'%{query}%'), User.email.ilike(f'%{query}%'))).all()
+    users, rank = search(User, query)
+    users, next_cursor = paginate(users.with_entities(*user_projection.columns), User.id, rank)
 
-    return jsonify(UserSchema(many=True).dump(users))
+    return json_response({
+        'users': user_projection.load_many(users),
+        'next_cursor': next_cursor
+    })
 
 
 @bp.route('/search/books', methods=['GET'])
@@ -28,9 +33,13 @@ def search_books():
     if not query:
         return bad_request('Search query must have value.')
 
-    books = Book.query.filter(Book.title.ilike(f'%{query}%')).all()
+    books, rank = search(Book, query)
+    books, next_cursor = paginate(books.with_entities(*book_projection.columns), Book.id, rank)
 
-    return jsonify(BookSchema(many=True).dump(books))
+    return json_response({
+        'books': book_projection.load_many(books),
+        'next_cursor': next_cursor
+    })
 
 
 @bp.route('/search/communities', methods=['GET'])
@@ -41,6 +50,11 @@ def search_communities():
     if not query:
         return bad_request('Search query must have value.')
 
-    communities = Community.query.filter(Community.name.ilike(f'%{query}%')).all()
+    communities, rank = search(Community, query)
+    communities = with_community(communities.with_entities(*community_projection.columns))
+    communities, next_cursor = paginate(communities, Community.id, rank)
 
-    return jsonify(CommunitySchema(many=True).dump(communities))
\ No newline at end of file
+    return json_response({
+        'communities': community_projection.load_many(communities),
+        'next_cursor': next_cursor
+    })
\ No newline at end of file
@@ -0,0 +1,180 @@
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import current_app, make_response, request
+
+
+class LRUCache:
+    """Thread-safe in-process LRU mapping whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._data.clear()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        if self.maxsize <= 0:
+            return
+
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class NullCache:
+    """Backend that stores nothing, used when response caching is disabled."""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class RedisCache:
+    """Backend on any client exposing the Redis get/set/delete/scan_iter commands.
+
+    Values must be bytes. Works with redis-py as well as an in-process stand-in
+    such as fakeredis for local runs.
+    """
+
+    def __init__(self, client, ttl=60, prefix='vivilio:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.client.get(self.prefix + key)
+
+        if value is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class ResponseCache:
+    """Caches the JSON body of successful GET responses per route and view arguments.
+
+    Write endpoints call invalidate() with the same route name and arguments to
+    drop entries they make stale, TTL bounds what they miss (other workers with
+    the in-process backend, admin edits). Requests with a query string bypass
+    the cache.
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+
+    def init_app(self, app):
+        name = app.config['RESPONSE_CACHE_BACKEND']
+        ttl = app.config['RESPONSE_CACHE_TTL']
+
+        if name == 'simple':
+            self.backend = LRUCache(app.config['RESPONSE_CACHE_SIZE'], ttl)
+        elif name == 'redis':
+            import redis
+            self.backend = RedisCache(redis.Redis.from_url(app.config['RESPONSE_CACHE_URL']), ttl)
+        else:
+            self.backend = NullCache()
+
+    @staticmethod
+    def key(name, **kwargs):
+        return ':'.join([name, *(f'{k}={kwargs[k]}' for k in sorted(kwargs))])
+
+    def cached(self, name):
+        def decorator(f):
+            @wraps(f)
+            def wrapper(**kwargs):
+                if request.args:
+                    return f(**kwargs)
+
+                key = self.key(name, **kwargs)
+                body = self.backend.get(key)
+
+                if body is not None:
+                    return current_app.response_class(body, mimetype='application/json')
+
+                response = make_response(f(**kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json':
+                    self.backend.set(key, response.get_data())
+
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, name, **kwargs):
+        self.backend.delete(self.key(name, **{k: str(v) for k, v in kwargs.items()}))
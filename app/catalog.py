@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import shutil
+from concurrent.futures import wait
+from itertools import islice
+from uuid import uuid4
+from flask import current_app
+from sqlalchemy import func, select, text
+from app import db, fulltext, lookups
+from app.images import get_executor, generate_variants
+from app.models import Book, BookGenre, BookStats, Publish, User
+
+
+# ? Catalog records carry these keys. genres is a list in JSONL and a
+# ? "|"-separated string in CSV, publisher is the email of an existing user.
+FIELDS = ('title', 'description', 'cover', 'genres', 'publisher')
+
+
+def read_records(path, on_error=None):
+    """Yield catalog records one at a time, from a .csv or .jsonl file.
+
+    JSONL lines that don't hold a JSON object are skipped and passed to
+    on_error(line number, reason), or raise ValueError without it.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+            return
+
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                reason = 'malformed JSON'
+            else:
+                if isinstance(record, dict):
+                    yield record
+                    continue
+                reason = 'not a JSON object'
+
+            if on_error is None:
+                raise ValueError(f'Line {number}: {reason}.')
+            on_error(number, reason)
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def allocate_ids(connection, table, n):
+    """Reserve n primary keys so rows can be inserted with executemany and still be referenced."""
+    if connection.dialect.name == 'postgresql':
+        return [id for id, in connection.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+            {'table': table.name, 'n': n}
+        )]
+
+    start = connection.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() + 1
+    return list(range(start, start + n))
+
+
+class CatalogImport:
+    """Insert catalog records batch by batch, keeping only the current batch in memory."""
+
+    def __init__(self, covers_dir):
+        self.covers_dir = covers_dir
+        self.folder = current_app.config['IMAGE_FOLDER_DIR']
+        self.quality = current_app.config['IMAGE_QUALITY']
+        self.imported = 0
+        self.skipped = {}
+        # ? Line numbers of the first 20 unreadable lines, to point at them
+        self.bad_lines = []
+        self.unknown_genres = 0
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def skip_line(self, number, reason):
+        self.skip(reason)
+        if len(self.bad_lines) < 20:
+            self.bad_lines.append(number)
+
+    def parse(self, record):
+        # ? JSON lines can hold any type where a CSV column is always a string
+        if not isinstance(record, dict):
+            return self.skip('invalid record')
+
+        fields = [record.get(f) or '' for f in ('title', 'description', 'cover', 'publisher')]
+        genres = record.get('genres') or []
+
+        if isinstance(genres, str):
+            genres = [g.strip() for g in genres.split('|') if g.strip()]
+
+        if not all(isinstance(f, str) for f in fields) or not isinstance(genres, list) \
+                or not all(isinstance(g, str) for g in genres):
+            return self.skip('invalid record')
+
+        title, description, cover, publisher = fields
+        title = title.strip()
+        description = description.strip()
+        cover = os.path.basename(cover)
+
+        if not title or not description or len(title) > 50 or len(description) > 250:
+            return self.skip('invalid title or description')
+
+        if not cover or cover.rsplit('.', 1)[-1].lower() not in current_app.config['ALLOWED_EXTENSIONS'] \
+                or not os.path.isfile(os.path.join(self.covers_dir, cover)):
+            return self.skip('missing cover')
+
+        return {
+            'title': title,
+            'description': description,
+            'cover': cover,
+            'genres': genres,
+            'publisher': publisher.strip()
+        }
+
+    def copy_cover(self, cover):
+        filename = f"{uuid4().hex}.{cover.rsplit('.', 1)[-1]}"
+        shutil.copyfile(os.path.join(self.covers_dir, cover), os.path.join(self.folder, filename))
+        return filename
+
+    def run(self, records):
+        records = [r for r in map(self.parse, records) if r]
+        emails = {r['publisher'] for r in records}
+        publishers = dict(db.session.query(User.email, User.id).filter(User.email.in_(emails)))
+
+        for r in records:
+            if r['publisher'] not in publishers:
+                self.skip('unknown publisher')
+        records = [r for r in records if r['publisher'] in publishers]
+
+        if not records:
+            return
+
+        genres = lookups.genres.get_many(g for r in records for g in r['genres'])
+        connection = db.session.connection()
+        ids = allocate_ids(connection, Book.__table__, len(records))
+        books, publishes, book_genres, variants = [], [], [], []
+
+        for id, r in zip(ids, records):
+            filename = self.copy_cover(r['cover'])
+            variants.append(get_executor().submit(generate_variants, self.folder, filename, self.quality))
+
+            books.append({
+                'id': id,
+                'title': r['title'],
+                'description': r['description'],
+                'cover': f'/api/images/{filename}'
+            })
+            publishes.append({'user_id': publishers[r['publisher']], 'book_id': id})
+
+            for genre_id in {genres[g] for g in r['genres'] if g in genres}:
+                book_genres.append({'book_id': id, 'genre_id': genre_id})
+            self.unknown_genres += sum(g not in genres for g in r['genres'])
+
+        connection.execute(Book.__table__.insert(), books)
+        connection.execute(Publish.__table__.insert(), publishes)
+        connection.execute(BookStats.__table__.insert(), [{'book_id': id} for id in ids])
+        if book_genres:
+            connection.execute(BookGenre.__table__.insert(), book_genres)
+        fulltext.index_many(connection, Book, books)
+        db.session.commit()
+
+        # ? Wait for this batch's variants so the executor queue stays bounded
+        wait(variants)
+        self.imported += len(books)
@@ -0,0 +1,219 @@
+import time
+from itertools import count
+from threading import Lock
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, exc, orm
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self._stats_lock = Lock()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self):
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self.wait_time / self.checkouts * 1000, 3) if self.checkouts else 0,
+            'max_wait_ms': round(self.max_wait * 1000, 3)
+        }
+
+
+def init_app(app):
+    # ? Copied so the Config class attribute is never mutated
+    options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+
+    if app.config['DATABASE_PGBOUNCER']:
+        options.setdefault('poolclass', NullPool)
+    elif 'pool_size' in options:
+        options.setdefault('poolclass', TimedQueuePool)
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        return {'class': type(pool).__name__, **pool.stats()}
+    return {'class': type(pool).__name__, 'status': pool.status()}
+
+
+@event.listens_for(SignallingSession, 'after_begin')
+def set_statement_timeout(session, transaction, connection):
+    # ? SET LOCAL ends with the transaction, so it also works through PgBouncer
+    # ? in transaction mode. Only requests are bounded, CLI jobs run as long as needed
+    if connection.dialect.name != 'postgresql' or not has_request_context():
+        return
+
+    timeout = current_app.config['DATABASE_STATEMENT_TIMEOUT']
+    if timeout:
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+
+class ReplicaRouter:
+    """Picks the read replica, if any, that serves the current request.
+
+    Replicas are the SQLALCHEMY_BINDS named replica_*, see
+    DATABASE_REPLICA_URLS. GET and HEAD requests to the API read from them in
+    turn, unless the client made a successful write within
+    DATABASE_REPLICA_PIN seconds, so nobody misses their own changes to
+    replication lag. The pin travels with the client rather than living in a
+    worker: writes answer with a replica_pin_until cookie and an
+    X-Replica-Pin-Until header holding the Unix time it ends, browsers send
+    the cookie back and other clients echo the header. A replica that cannot
+    be connected to is skipped for DATABASE_REPLICA_RETRY seconds and its
+    reads go to the primary.
+    """
+
+    READ_METHODS = ('GET', 'HEAD')
+    PIN_COOKIE = 'replica_pin_until'
+    PIN_HEADER = 'X-Replica-Pin-Until'
+
+    def __init__(self):
+        self.keys = []
+        self.routed = 0
+        self.pinned = 0
+        self.fallbacks = 0
+        self._down = {}
+        self._next = count()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.keys = sorted(k for k in app.config.get('SQLALCHEMY_BINDS') or {} if k.startswith('replica_'))
+
+        if not self.keys:
+            return
+
+        app.before_request(self.route)
+        app.after_request(self.pin)
+
+    def pinned_until(self):
+        value = request.headers.get(self.PIN_HEADER) or request.cookies.get(self.PIN_COOKIE)
+        try:
+            until = float(value)
+        except (TypeError, ValueError):
+            return 0
+        # ? Never trust a pin longer than the server would have given
+        return min(until, time.time() + current_app.config['DATABASE_REPLICA_PIN'])
+
+    def choose(self):
+        now = time.monotonic()
+        for _ in range(len(self.keys)):
+            key = self.keys[next(self._next) % len(self.keys)]
+            if self._down.get(key, 0) <= now:
+                return key
+        return None
+
+    def mark_down(self, key):
+        with self._lock:
+            self._down[key] = time.monotonic() + current_app.config['DATABASE_REPLICA_RETRY']
+            self.fallbacks += 1
+        current_app.logger.warning(f'Read replica {key} is unavailable, reading from the primary.')
+
+    def route(self):
+        g.db_replica = None
+        g.pop('db_replica_engine', None)
+
+        if request.method not in self.READ_METHODS or request.blueprint != 'api':
+            return
+
+        if self.pinned_until() > time.time():
+            with self._lock:
+                self.pinned += 1
+            return
+
+        g.db_replica = self.choose()
+
+    def pin(self, response):
+        if request.method in self.READ_METHODS or request.blueprint != 'api' or response.status_code >= 400:
+            return response
+
+        pin = current_app.config['DATABASE_REPLICA_PIN']
+        until = f'{time.time() + pin:.3f}'
+        response.headers[self.PIN_HEADER] = until
+        response.set_cookie(self.PIN_COOKIE, until, max_age=pin, path='/api', httponly=True, samesite='Lax')
+        return response
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'replicas': {key: 'down' if self._down.get(key, 0) > now else 'up' for key in self.keys},
+            'routed': self.routed,
+            'pinned': self.pinned,
+            'fallbacks': self.fallbacks
+        }
+
+
+replicas = ReplicaRouter()
+
+
+class RoutingSession(SignallingSession):
+    """Session reading from the replica ReplicaRouter picked for the request.
+
+    Everything else, and every statement of the request once the session has
+    flushed, goes to the primary.
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_request_context() and g.get('db_replica'):
+            if 'db_replica_engine' not in g:
+                g.db_replica_engine = self._connect_replica(g.db_replica)
+            if g.db_replica_engine is not None:
+                return g.db_replica_engine
+        return super().get_bind(mapper, clause)
+
+    def _connect_replica(self, key):
+        engine = self.db.get_engine(self.app, bind=key)
+        try:
+            # ? Connect now, so an unreachable replica falls back to the primary
+            # ? instead of failing the request
+            self.connection(bind=engine)
+        except exc.DBAPIError:
+            replicas.mark_down(key)
+            return None
+
+        with replicas._lock:
+            replicas.routed += 1
+        return engine
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def use_primary(session, flush_context, instances):
+    if has_request_context():
+        g.db_replica = None
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
@@ -1,20 +1,135 @@
-from threading import Thread
+import smtplib
+import time
+from itertools import count
+from queue import Queue, Empty
+from threading import Thread, Lock
 from flask import render_template, current_app
 from flask_mail import Message
 from app import mail
 
 
-def send_async_email(app, msg):
-    with app.app_context():
-        mail.connect()
-        mail.send(msg)
+class MailQueue:
+    """Bounded in-memory queue drained by a fixed set of sender threads.
+
+    Each thread keeps its SMTP connection open while there is mail to send and
+    closes it after MAIL_IDLE_TIMEOUT seconds without any. Failed deliveries are
+    retried on a fresh connection with exponential backoff. When the queue is
+    full, send_email blocks for MAIL_QUEUE_TIMEOUT seconds and then raises
+    queue.Full so callers feel the backpressure.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.workers = []
+        self.sent = 0
+        self.failed = 0
+        self._names = count()
+        self._lock = Lock()
+
+    def start(self, app):
+        with self._lock:
+            # ? Replace the threads that died, the queue and its mail survive them
+            self.workers = [w for w in self.workers if w.is_alive()]
+            if len(self.workers) >= app.config['MAIL_WORKERS']:
+                return
+
+            if self.queue is None:
+                self.queue = Queue(maxsize=app.config['MAIL_QUEUE_SIZE'])
+            for _ in range(app.config['MAIL_WORKERS'] - len(self.workers)):
+                worker = Thread(target=self._work, args=(app,), name=f'mail-{next(self._names)}', daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def put(self, msg):
+        app = current_app._get_current_object()
+        self.start(app)
+        self.queue.put(msg, timeout=app.config['MAIL_QUEUE_TIMEOUT'])
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize() if self.queue else 0,
+            'workers': len(self.workers),
+            'sent': self.sent,
+            'failed': self.failed
+        }
+
+    def _work(self, app):
+        with app.app_context():
+            connection = None
+
+            while True:
+                try:
+                    msg = self.queue.get(timeout=app.config['MAIL_IDLE_TIMEOUT'] if connection else None)
+                except Empty:
+                    connection = self._close(connection)
+                    continue
+
+                batch = [msg]
+                while len(batch) < app.config['MAIL_BATCH_SIZE']:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+
+                for msg in batch:
+                    try:
+                        connection = self._deliver(app, connection, msg)
+                    except Exception:
+                        # ? A message flask_mail refuses to build, e.g. without
+                        # ? recipients or with a newline in a header, must not
+                        # ? take the thread down with it
+                        connection = self._close(connection)
+                        with self._lock:
+                            self.failed += 1
+                        app.logger.exception(f'Could not send email "{msg.subject}" to {msg.recipients}.')
+                    finally:
+                        self.queue.task_done()
+
+    def _deliver(self, app, connection, msg):
+        for attempt in range(app.config['MAIL_MAX_RETRIES'] + 1):
+            try:
+                if connection is None:
+                    # ? Kept only once connected, a refused one has nothing to close
+                    connection = mail.connect().__enter__()
+
+                connection.send(msg)
+                with self._lock:
+                    self.sent += 1
+                return connection
+            except smtplib.SMTPResponseException as e:
+                connection = self._close(connection)
+                # ? 5xx replies are permanent, sending again won't help
+                if e.smtp_code >= 500:
+                    break
+            except (smtplib.SMTPException, OSError):
+                connection = self._close(connection)
+
+            if attempt < app.config['MAIL_MAX_RETRIES']:
+                time.sleep(app.config['MAIL_RETRY_BACKOFF'] * 2 ** attempt)
+
+        with self._lock:
+            self.failed += 1
+        app.logger.error(f'Could not send email "{msg.subject}" to {msg.recipients}.')
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+        return None
+
+
+mail_queue = MailQueue()
 
 
 def send_email(subject, sender, recipients, text_body, html_body):
     msg = Message(subject, sender=sender, recipients=recipients)
     msg.body = text_body
     msg.html = html_body
-    Thread(target=send_async_email, args=(current_app, msg)).start()
+    mail_queue.put(msg)
 
 
 def send_something(user, password):
@@ -24,4 +139,4 @@ def send_something(user, password):
         recipients=[user.email],
         text_body=render_template('email/sample.txt', user=user, password=password),
         html_body=render_template('email/sample.html', user=user, password=password)
-    )
\ No newline at end of file
+    )
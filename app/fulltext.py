@@ -0,0 +1,189 @@
+import re
+from flask import current_app
+from sqlalchemy import DDL, Float, cast, column, event, false, func, literal_column, or_, table, text
+from app import db
+from app.models import Book, Community, User
+
+
+# ? Columns matched by the search endpoints, per model
+FIELDS = {
+    Book: ('title',),
+    User: ('name', 'email'),
+    Community: ('name',),
+}
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class LikeSearch:
+    """Unindexed substring match for databases without a full-text engine."""
+
+    @staticmethod
+    def unranked():
+        # ? Not a bare 0, which ORDER BY would read as a column position
+        return cast(0, Float)
+
+    def match(self, model, query):
+        pattern = f'%{query}%'
+        criterion = or_(*[getattr(model, f).ilike(pattern) for f in FIELDS[model]])
+        return model.query.filter(criterion), self.unranked()
+
+    def sync(self, connection, model, target):
+        pass
+
+    def remove(self, connection, model, target):
+        pass
+
+    def index_many(self, connection, model, rows):
+        pass
+
+    def reindex(self, connection):
+        pass
+
+
+class PostgresSearch(LikeSearch):
+    """tsvector match served by the GIN expression indexes created in DDL below.
+
+    Words match from their start, not in the middle like the LIKE backend does.
+    """
+
+    @staticmethod
+    def document(model):
+        fields = [func.coalesce(getattr(model, f), literal_column("''")) for f in FIELDS[model]]
+        document = fields[0]
+        for field in fields[1:]:
+            document = document.op('||')(literal_column("' '")).op('||')(field)
+        return func.to_tsvector(literal_column("'simple'"), document)
+
+    def match(self, model, query):
+        tokens = tokenize(query)
+
+        if not tokens:
+            return model.query.filter(false()), self.unranked()
+
+        # ? Every word as a prefix, or the query as the parser reads it, which keeps
+        # ? an email address or URL in one lexeme the way it was indexed
+        tsquery = func.to_tsquery(literal_column("'simple'"), ' & '.join(f'{t}:*' for t in tokens)) \
+            .op('||')(func.plainto_tsquery(literal_column("'simple'"), query))
+        document = self.document(model)
+
+        # ? ts_rank is a real, widen it so cursors round-trip exactly
+        return model.query.filter(document.op('@@')(tsquery)), cast(func.ts_rank(document, tsquery), Float)
+
+
+class SQLiteSearch(LikeSearch):
+    """FTS5 shadow tables named <table>_fts, kept in sync by the mapper events below."""
+
+    @staticmethod
+    def fts(model):
+        return table(f'{model.__tablename__}_fts', column('rowid'), column('rank'))
+
+    def match(self, model, query):
+        tokens = tokenize(query)
+
+        if not tokens:
+            return model.query.filter(false()), self.unranked()
+
+        fts = self.fts(model)
+        expression = ' '.join(f'"{t}"*' for t in tokens)
+
+        # ? FTS5 rank is bm25, where lower means more relevant
+        return model.query.join(fts, fts.c.rowid == model.id) \
+            .filter(literal_column(fts.name).op('MATCH')(expression)), -fts.c.rank
+
+    def sync(self, connection, model, target):
+        fields = FIELDS[model]
+        name = f'{model.__tablename__}_fts'
+
+        connection.execute(text(f'DELETE FROM {name} WHERE rowid = :id'), {'id': target.id})
+        connection.execute(
+            text(f'INSERT INTO {name} (rowid, {", ".join(fields)}) VALUES (:id, {", ".join(":" + f for f in fields)})'),
+            {'id': target.id, **{f: getattr(target, f) for f in fields}}
+        )
+
+    def remove(self, connection, model, target):
+        connection.execute(text(f'DELETE FROM {model.__tablename__}_fts WHERE rowid = :id'), {'id': target.id})
+
+    def index_many(self, connection, model, rows):
+        fields = FIELDS[model]
+        connection.execute(
+            text(f'INSERT INTO {model.__tablename__}_fts (rowid, {", ".join(fields)}) '
+                 f'VALUES (:id, {", ".join(":" + f for f in fields)})'),
+            [{'id': row['id'], **{f: row[f] for f in fields}} for row in rows]
+        )
+
+    def reindex(self, connection):
+        for model, fields in FIELDS.items():
+            name = f'{model.__tablename__}_fts'
+            connection.execute(text(f'DELETE FROM {name}'))
+            connection.execute(text(
+                f'INSERT INTO {name} (rowid, {", ".join(fields)}) '
+                f'SELECT id, {", ".join(fields)} FROM {model.__tablename__}'
+            ))
+
+
+BACKENDS = {
+    'like': LikeSearch(),
+    'postgresql': PostgresSearch(),
+    'sqlite': SQLiteSearch(),
+}
+
+
+def get_backend(dialect=None):
+    name = current_app.config.get('SEARCH_BACKEND') or dialect or db.engine.dialect.name
+    return BACKENDS.get(name, BACKENDS['like'])
+
+
+def search(model, query):
+    """Return a query of matching rows and a relevance expression, higher is better."""
+    return get_backend().match(model, query)
+
+
+def index_many(connection, model, rows):
+    """Index freshly inserted rows (dicts with id and the FIELDS of model).
+
+    Bulk inserts through the Core skip the mapper events below, so callers
+    making them have to index the rows themselves.
+    """
+    get_backend(connection.dialect.name).index_many(connection, model, rows)
+
+
+def reindex():
+    with db.engine.begin() as connection:
+        get_backend(connection.dialect.name).reindex(connection)
+
+
+def _after_write(mapper, connection, target):
+    model = mapper.class_
+    state = db.inspect(target)
+
+    if state.has_identity and not any(state.attrs[f].history.has_changes() for f in FIELDS[model]):
+        return
+
+    get_backend(connection.dialect.name).sync(connection, model, target)
+
+
+def _after_delete(mapper, connection, target):
+    get_backend(connection.dialect.name).remove(connection, mapper.class_, target)
+
+
+for _model, _fields in FIELDS.items():
+    _table = _model.__tablename__
+
+    event.listen(_model.__table__, 'after_create', DDL(
+        f'CREATE VIRTUAL TABLE {_table}_fts USING fts5({", ".join(_fields)})'
+    ).execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'before_drop', DDL(
+        f'DROP TABLE IF EXISTS {_table}_fts'
+    ).execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'after_create', DDL(
+        f"CREATE INDEX ix_{_table}_fts ON {_table} USING gin (to_tsvector('simple', "
+        + " || ' ' || ".join(f"coalesce({_table}.{f}, '')" for f in _fields)
+        + '))'
+    ).execute_if(dialect='postgresql'))
+
+    event.listen(_model, 'after_insert', _after_write)
+    event.listen(_model, 'after_update', _after_write)
+    event.listen(_model, 'after_delete', _after_delete)
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from uuid import uuid4
+from flask import current_app
+from PIL import Image
+
+
+# ? Bounding boxes of the resized covers, served by /api/images/<filename>?size=
+SIZES = {
+    'thumbnail': (160, 240),
+    'medium': (480, 720),
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config['IMAGE_WORKERS'],
+                    thread_name_prefix='images'
+                )
+    return _executor
+
+
+def variant_name(filename, size):
+    if size == 'original':
+        return filename
+    return f"{filename.rsplit('.', 1)[0]}_{size}.jpg"
+
+
+def generate_variants(folder, filename, quality):
+    try:
+        with Image.open(os.path.join(folder, filename)) as image:
+            image.load()
+            if image.mode != 'RGB':
+                # ? JPEG has no alpha, flatten transparent PNGs onto white
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.convert('RGBA'))
+                image = background
+
+            for size, box in SIZES.items():
+                variant = image.copy()
+                variant.thumbnail(box, Image.LANCZOS)
+
+                # ? Write then rename so a half-written file is never served
+                path = os.path.join(folder, variant_name(filename, size))
+                variant.save(f'{path}.tmp', 'JPEG', quality=quality, optimize=True, progressive=True)
+                os.replace(f'{path}.tmp', path)
+    except OSError:
+        # ? Not a readable image, get_image keeps serving the original
+        pass
+
+
+def save_cover(cover):
+    extension = cover.filename.rsplit('.', 1)[-1]
+    unique_name = uuid4().hex
+    filename = f'{unique_name}.{extension}'
+    folder = current_app.config['IMAGE_FOLDER_DIR']
+
+    cover.save(os.path.join(folder, filename))
+    get_executor().submit(generate_variants, folder, filename, current_app.config['IMAGE_QUALITY'])
+
+    return filename
+
+
+def delete_cover(filename):
+    folder = current_app.config['IMAGE_FOLDER_DIR']
+
+    for size in ['original', *SIZES]:
+        path = os.path.join(folder, variant_name(filename, size))
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,240 @@
+import json
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from flask import current_app, g, has_request_context, request
+from flask.json import JSONEncoder
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger('vivilio.requests')
+
+# ? Upper bounds in milliseconds of the latency histogram buckets, the last one is open
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RequestTimer:
+    """Time spent by the current request in SQL and in serialization."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self._depth = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def current_timer():
+    return g.get('request_timer') if has_request_context() else None
+
+
+@contextmanager
+def serializing():
+    """Add the time of the block to the request's serialization time, once when nested."""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+
+    timer._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer._depth -= 1
+        if not timer._depth:
+            timer.serialize_time += time.perf_counter() - start
+
+
+class TimedDump:
+    """Schema mixin timing dump() as serialization."""
+
+    def dump(self, obj, *, many=None):
+        with serializing():
+            return super().dump(obj, many=many)
+
+
+class TimedJSONEncoder(JSONEncoder):
+    """JSON encoder of jsonify, timing the encoding as serialization."""
+
+    def encode(self, o):
+        with serializing():
+            return super().encode(o)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_timer() is not None:
+        context._query_start = time.perf_counter()
+
+
+def _record_query(context):
+    # ? The start lives on the statement's own context, so one that fails
+    # ? leaves nothing behind on the connection
+    start = getattr(context, '_query_start', None)
+    timer = current_timer()
+    if start is not None and timer is not None:
+        del context._query_start
+        timer.queries += 1
+        timer.db_time += time.perf_counter() - start
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    _record_query(exception_context.execution_context)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        # ? Upper bound of the bucket holding the p-th percentile
+        rank = self.count * p / 100
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return round(self.max, 3)
+
+    def stats(self):
+        return {
+            'count': self.count,
+            'avg': round(self.sum / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            # ? [upper bound, count] pairs, jsonify would sort a dict's keys as strings
+            'buckets': [[b, n] for b, n in zip(BUCKETS + ('inf',), self.counts)]
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db = Histogram()
+        self.serialize = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.errors = 0
+
+
+class RequestMetrics:
+    """Per endpoint histograms of latency, SQL time and serialization time, in milliseconds."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = Lock()
+
+    def record(self, endpoint, status, total, db, serialize, queries):
+        with self._lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics()
+
+            metrics.latency.observe(total)
+            metrics.db.observe(db)
+            metrics.serialize.observe(serialize)
+            metrics.queries += queries
+            metrics.max_queries = max(metrics.max_queries, queries)
+            metrics.errors += status >= 500
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'latency_ms': m.latency.stats(),
+                    'db_ms': m.db.stats(),
+                    'serialize_ms': m.serialize.stats(),
+                    'avg_queries': round(m.queries / m.latency.count, 2) if m.latency.count else 0,
+                    'max_queries': m.max_queries,
+                    'errors': m.errors
+                }
+                for endpoint, m in sorted(self.endpoints.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+def init_app(app):
+    app.json_encoder = TimedJSONEncoder
+
+    if app.config['REQUEST_LOG'] and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    # ? Registered ahead of the read replica router, so the time it spends
+    # ? picking a replica counts, and after_request handlers run in reverse
+    # ? so finish_request sees every other one
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+
+def start_request():
+    if request.blueprint == 'api':
+        g.request_timer = RequestTimer()
+
+
+def finish_request(response):
+    timer = g.pop('request_timer', None)
+    if timer is None:
+        return response
+
+    total = timer.elapsed() * 1000
+    db = timer.db_time * 1000
+    serialize = timer.serialize_time * 1000
+    endpoint = request.endpoint or 'unknown'
+
+    request_metrics.record(endpoint, response.status_code, total, db, serialize, timer.queries)
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={db:.2f};desc="{timer.queries} queries"',
+            f'serialize;dur={serialize:.2f}',
+            f'app;dur={max(total - db - serialize, 0):.2f}',
+            f'total;dur={total:.2f}'
+        ])
+
+    if current_app.config['REQUEST_LOG']:
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'total_ms': round(total, 3),
+            'db_ms': round(db, 3),
+            'queries': timer.queries,
+            'serialize_ms': round(serialize, 3)
+        }))
+
+    return response
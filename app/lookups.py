@@ -0,0 +1,74 @@
+import time
+from threading import Lock
+from flask import current_app
+from app import db
+from app.models import Category, Genre, Role, Visibility
+
+
+class LookupTable:
+    """In-process type -> id map of a small lookup model.
+
+    Loaded on first use and reloaded after LOOKUP_TTL seconds, or right away
+    when refresh() is called after an admin edit in this worker. Types missing
+    from the map are looked up in the database, so rows added elsewhere are
+    found before the next reload.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._ids = None
+        self._expires = 0
+        self._lock = Lock()
+
+    def load(self):
+        # ? Lowest id wins for duplicate types, like the .first() lookups did
+        rows = db.session.query(self.model.type, self.model.id).order_by(self.model.id.desc()).all()
+
+        with self._lock:
+            self._ids = dict(rows)
+            self._expires = time.monotonic() + current_app.config['LOOKUP_TTL']
+
+        return self._ids
+
+    def refresh(self):
+        with self._lock:
+            self._ids = None
+
+    def ids(self):
+        ids = self._ids
+        if ids is None or self._expires < time.monotonic():
+            ids = self.load()
+        return ids
+
+    def _remember(self, found):
+        with self._lock:
+            if self._ids is not None:
+                self._ids = {**self._ids, **found}
+
+    def get(self, type):
+        """Return the id of the row of this type, or None."""
+        return self.get_many([type]).get(type)
+
+    def get_many(self, types):
+        """Return a dict of type -> id for the types that exist, with one query for any misses."""
+        ids = self.ids()
+        types = set(types)
+        found = {t: ids[t] for t in types if t in ids}
+        missing = types - found.keys()
+
+        if missing:
+            rows = db.session.query(self.model.type, self.model.id) \
+                .filter(self.model.type.in_(missing)) \
+                .order_by(self.model.id.desc()) \
+                .all()
+            if rows:
+                self._remember(dict(rows))
+                found.update(rows)
+
+        return found
+
+
+roles = LookupTable(Role)
+visibilities = LookupTable(Visibility)
+categories = LookupTable(Category)
+genres = LookupTable(Genre)
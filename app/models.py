@@ -1,14 +1,16 @@
 from datetime import date
-from werkzeug.security import check_password_hash, generate_password_hash
 from sqlalchemy_utils import URLType
 from app import db
+from app.passwords import password_hasher
+from app.analytics.reviews import POSITIVE, NEGATIVE
 
 
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(50), index=True, unique=True)
-    password_hash = db.Column(db.String(128))
+    # ? Only sign-in needs it, keeping it out of every user load and of the user cache
+    password_hash = db.deferred(db.Column(db.String(128)))
     name = db.Column(db.String(40))
     member_since = db.Column(db.Date, default=date.today)
     bio = db.Column(db.String(250))
@@ -31,10 +33,13 @@ class User(db.Model):
     posts = db.relationship("Post", backref="author", lazy="dynamic")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
     def get_user_info(self):
         return {
@@ -53,9 +58,6 @@ class User(db.Model):
     def get_user_genre(self):
         return {'strengths': [s.get_genre_info() for s in self.strength]}
 
-    def get_user_books(self):
-        return {'books': [p.get_book_info() for p in self.publishes]}
-
     def __repr__(self) -> str:
         return f'<User: {self.email}>'
 
@@ -95,9 +97,6 @@ class Book(db.Model):
             'cover': self.cover
         }
     
-    def get_book_reviews(self):
-        return {'reviews': [r.get_review_info() for r in self.reviews]}
-
     def get_book_genre(self):
         return {'books_genres': [g.get_genre_info() for g in self.genres]}
 
@@ -150,9 +149,6 @@ class Community(db.Model):
             'category': self.category.get_category_info()
         }
 
-    def get_community_posts(self):
-        return {'posts': [p.get_post_info() for p in self.posts]}
-
     def get_community_users(self):
         return {'users': [u.get_user_info() for u in self.users]}
 
@@ -204,7 +200,7 @@ class Post(db.Model):
     content = db.Column(db.Text)
     turn_off_commenting = db.Column(db.Boolean, default=False)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    community_id = db.Column(db.Integer, db.ForeignKey('community.id'))
+    community_id = db.Column(db.Integer, db.ForeignKey('community.id'), index=True)
     comments = db.relationship("Comment", backref="post")
 
     def get_post_info(self):
@@ -213,14 +209,15 @@ class Post(db.Model):
             'content': self.content,
             'turn_off_commenting': self.turn_off_commenting,
             'author': {
-                "id": self.author.id,
-                "name": self.author.name
+                "id": self.author_id,
+                "name": self.author_name
             },
             'community_id': self.community_id
         }
 
-    def get_post_comments(self):
-        return {'comments': [c.get_comment_info() for c in self.comments]}
+    @property
+    def author_name(self):
+        return self.author.name
 
     def __repr__(self) -> str:
         return f'<Post: {self.id}>'
@@ -232,12 +229,13 @@ class Post(db.Model):
 class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    book_id = db.Column(db.Integer, db.ForeignKey('book.id'))
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), index=True)
     overview = db.Column(db.String(50))
     content = db.Column(db.Text)
     star = db.Column(db.Integer)
     started = db.Column(db.Date)
     finished = db.Column(db.Date)
+    sentiment = db.Column(db.String(10))
 
     author = db.relationship("User", uselist=False)
 
@@ -251,9 +249,13 @@ class Review(db.Model):
             'star': self.star,
             'started': self.started,
             'finished': self.finished,
-            'author': self.author.name
+            'author': self.author_name
         }
 
+    @property
+    def author_name(self):
+        return self.author.name
+
     def __repr__(self) -> str:
         return f'<Review: {self.id}>'
 
@@ -261,8 +263,106 @@ class Review(db.Model):
         return f'{self.id}'
 
 
+class BookStats(db.Model):
+    __tablename__ = 'book_stats'
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    star_sum = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)
+    # ? Reviews with both dates, the ones duration_sum is made of
+    dated_count = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+
+    COUNTERS = ('review_count', 'star_sum', 'duration_sum', 'dated_count', 'positive', 'negative')
+
+    @staticmethod
+    def contribution(review):
+        dated = bool(review.started and review.finished)
+        duration = (review.finished - review.started).days if dated else 0
+
+        return {
+            'review_count': 1,
+            'star_sum': int(review.star or 0),
+            'duration_sum': duration,
+            'dated_count': int(dated),
+            'positive': int(review.sentiment == POSITIVE),
+            'negative': int(review.sentiment == NEGATIVE)
+        }
+
+    @staticmethod
+    def apply(book_id, before=None, after=None):
+        # ? Counters are incremented in SQL so concurrent reviews on the same
+        # ? book don't overwrite each other, and land in the caller's commit.
+        before = before or {}
+        after = after or {}
+        delta = {c: after.get(c, 0) - before.get(c, 0) for c in BookStats.COUNTERS}
+
+        if not any(delta.values()):
+            return
+
+        updated = BookStats.query.filter_by(book_id=book_id).update(
+            {getattr(BookStats, c): getattr(BookStats, c) + v for c, v in delta.items()},
+            synchronize_session=False
+        )
+
+        if not updated:
+            db.session.add(BookStats(book_id=book_id, **delta))
+
+    def get_statistics_info(self):
+        if not self.review_count:
+            return {
+                'avg_star': 0,
+                'avg_duration_to_finish': 0,
+                'positive': 0,
+                'negative': 0
+            }
+
+        return {
+            'avg_star': float(round(self.star_sum / self.review_count, 1)),
+            'avg_duration_to_finish': int(round(self.duration_sum / self.dated_count)) if self.dated_count else 0,
+            'positive': self.positive,
+            'negative': self.negative
+        }
+
+    def __repr__(self) -> str:
+        return f'<BookStats: {self.book_id}>'
+
+    def __str__(self) -> str:
+        return f'{self.book_id}'
+
+
+class BookActivity(db.Model):
+    __tablename__ = 'book_activity'
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    reviews = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f'<BookActivity: {self.book_id} {self.day}>'
+
+    def __str__(self) -> str:
+        return f'{self.book_id} {self.day}'
+
+
+class BookTrending(db.Model):
+    __tablename__ = 'book_trending'
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    rank = db.Column(db.Integer, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<BookTrending: {self.rank} {self.book_id}>'
+
+    def __str__(self) -> str:
+        return f'{self.book_id}'
+
+
 class BookGenre(db.Model):
     __tablename__ = 'bookgenre'
+    __table_args__ = (db.Index('ix_bookgenre_book_id_genre_id', 'book_id', 'genre_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'))
     genre_id = db.Column(db.Integer, db.ForeignKey('genre.id'))
@@ -275,9 +375,10 @@ class BookGenre(db.Model):
     
 
 class Publish(db.Model):
+    __table_args__ = (db.Index('ix_publish_user_id_book_id', 'user_id', 'book_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    book_id = db.Column(db.Integer, db.ForeignKey('book.id'))
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), index=True)
 
     def __repr__(self) -> str:
         return f'<Review: {self.id}>'
@@ -287,6 +388,7 @@ class Publish(db.Model):
 
 
 class Strength(db.Model):
+    __table_args__ = (db.Index('ix_strength_user_id_genre_id', 'user_id', 'genre_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     genre_id = db.Column(db.Integer, db.ForeignKey('genre.id'))
@@ -299,9 +401,10 @@ class Strength(db.Model):
 
 
 class Membership(db.Model):
+    __table_args__ = (db.Index('ix_membership_user_id_community_id', 'user_id', 'community_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    community_id = db.Column(db.Integer, db.ForeignKey('community.id'))
+    community_id = db.Column(db.Integer, db.ForeignKey('community.id'), index=True)
     role_id = db.Column(db.Integer, db.ForeignKey('role.id'))
 
     profile = db.relationship('User', uselist=False)
@@ -319,7 +422,7 @@ class Membership(db.Model):
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'))
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), index=True)
     content = db.Column(db.Text)
 
     author = db.relationship("User", uselist=False)
@@ -328,9 +431,13 @@ class Comment(db.Model):
         return {
             'id': self.id,
             'author': {
-                'id': self.author.id,
-                'name': self.author.name
+                'id': self.user_id,
+                'name': self.author_name
             },
             'post_id': self.post_id,
             'content': self.content
-        }
\ No newline at end of file
+        }
+
+    @property
+    def author_name(self):
+        return self.author.name
\ No newline at end of file
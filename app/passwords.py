@@ -0,0 +1,126 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordPoolBusy(Exception):
+    """PASSWORD_QUEUE_SIZE hashes were already waiting for the pool for PASSWORD_QUEUE_TIMEOUT seconds,
+    or the pool broke again after being replaced."""
+
+
+class PasswordHasher:
+    """Hashes and checks passwords on a per worker process pool.
+
+    Key derivation is CPU bound by design, a login costs tens of milliseconds
+    of one core. Done in the request it takes that core from the worker's other
+    requests (hashlib releases the GIL, but a gevent worker has no other thread
+    to run them on), and a worker never hashes on more cores than it has
+    threads. Running it on PASSWORD_PROCESSES processes keeps that cost off the
+    request workers and spreads a burst of logins over the cores. At most
+    PASSWORD_QUEUE_SIZE hashes are queued or running at once, callers beyond
+    that wait PASSWORD_QUEUE_TIMEOUT seconds and then get PasswordPoolBusy.
+    A pool whose process died is replaced. With PASSWORD_PROCESSES = 0 hashing
+    runs inline in the request.
+
+    PASSWORD_HASH_METHOD takes any werkzeug method, e.g. pbkdf2:sha256:600000.
+    Hashes made with another method or salt length are upgraded on login, see
+    needs_rehash().
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._slots = None
+        self._lock = Lock()
+        self.hashed = 0
+        self.checked = 0
+        self.rejected = 0
+
+    def get_pool(self, app):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self._slots is None:
+                        self._slots = BoundedSemaphore(app.config['PASSWORD_QUEUE_SIZE'])
+                    self._pool = ProcessPoolExecutor(max_workers=app.config['PASSWORD_PROCESSES'])
+        return self._pool
+
+    def _replace_pool(self, broken):
+        # ? Slots are kept, the callers holding them release into the same semaphore
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            'processes': current_app.config['PASSWORD_PROCESSES'] if self._pool else 0,
+            'hashed': self.hashed,
+            'checked': self.checked,
+            'rejected': self.rejected
+        }
+
+    def _run(self, fn, *args):
+        app = current_app._get_current_object()
+
+        if app.config['PASSWORD_PROCESSES'] <= 0:
+            return fn(*args)
+
+        pool = self.get_pool(app)
+        if not self._slots.acquire(timeout=app.config['PASSWORD_QUEUE_TIMEOUT']):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+
+        try:
+            for _ in range(2):
+                try:
+                    return pool.submit(fn, *args).result()
+                except BrokenProcessPool:
+                    # ? A process died (OOM killer, signal) and the executor
+                    # ? refuses all work since, start a new one and try once more
+                    app.logger.warning('A password hashing process died, restarting the pool.')
+                    self._replace_pool(pool)
+                    pool = self.get_pool(app)
+
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def method():
+        # ? Spelled out the way werkzeug writes it into the hash
+        method = current_app.config['PASSWORD_HASH_METHOD']
+        if method == 'pbkdf2':
+            method = 'pbkdf2:sha256'
+        if method.startswith('pbkdf2:') and method.count(':') == 1:
+            method = f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+        return method
+
+    def hash(self, password):
+        pwhash = self._run(generate_password_hash, password, self.method(), current_app.config['PASSWORD_SALT_LENGTH'])
+        with self._lock:
+            self.hashed += 1
+        return pwhash
+
+    def check(self, pwhash, password):
+        if not pwhash:
+            return False
+
+        valid = self._run(check_password_hash, pwhash, password)
+        with self._lock:
+            self.checked += 1
+        return valid
+
+    def needs_rehash(self, pwhash):
+        if not pwhash or pwhash.count('$') < 2:
+            return True
+
+        method, salt, _ = pwhash.split('$', 2)
+        return method != self.method() or len(salt) != current_app.config['PASSWORD_SALT_LENGTH']
+
+
+password_hasher = PasswordHasher()
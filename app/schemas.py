@@ -1,8 +1,9 @@
 from app import ma
+from app.instrumentation import TimedDump
 from app.models import User, Book, Category, Comment, Community, Genre, Membership, Post, Review, Publish, Strength, Role, Visibility, BookGenre
 
 
-class UserSchema(ma.SQLAlchemySchema):
+class UserSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = User
     
@@ -19,7 +20,7 @@ class UserSchema(ma.SQLAlchemySchema):
     # strength = ma.auto_field()
 
 
-class RoleSchema(ma.SQLAlchemySchema):
+class RoleSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Role
     
@@ -27,7 +28,7 @@ class RoleSchema(ma.SQLAlchemySchema):
     type = ma.auto_field()
 
 
-class BookSchema(ma.SQLAlchemySchema):
+class BookSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Book
 
@@ -37,12 +38,12 @@ class BookSchema(ma.SQLAlchemySchema):
     cover = ma.auto_field()
     
 
-class GenreSchema(ma.SQLAlchemyAutoSchema):
+class GenreSchema(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Genre
 
 
-class VisibilitySchema(ma.SQLAlchemySchema):
+class VisibilitySchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Visibility
 
@@ -50,12 +51,12 @@ class VisibilitySchema(ma.SQLAlchemySchema):
     type = ma.auto_field()
 
 
-class CategorySchema(ma.SQLAlchemyAutoSchema):
+class CategorySchema(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Category
 
 
-class CommunitySchema(ma.SQLAlchemySchema):
+class CommunitySchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Community
 
@@ -67,7 +68,7 @@ class CommunitySchema(ma.SQLAlchemySchema):
     category = ma.Nested(CategorySchema())
 
 
-class PostSchema(ma.SQLAlchemySchema):
+class PostSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Post
 
@@ -77,12 +78,12 @@ class PostSchema(ma.SQLAlchemySchema):
     author = ma.Nested(UserSchema())
 
 
-class BookGenre(ma.SQLAlchemyAutoSchema):
+class BookGenre(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = BookGenre
 
 
-class CommentSchema(ma.SQLAlchemySchema):
+class CommentSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Comment
 
@@ -92,12 +93,12 @@ class CommentSchema(ma.SQLAlchemySchema):
     content = ma.auto_field()
 
 
-class ReviewSchema(ma.SQLAlchemyAutoSchema):
+class ReviewSchema(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Review
 
 
-class MembershipSchema(ma.SQLAlchemySchema):
+class MembershipSchema(TimedDump, ma.SQLAlchemySchema):
     class Meta:
         model = Membership
 
@@ -107,11 +108,11 @@ class MembershipSchema(ma.SQLAlchemySchema):
     community = ma.Nested(CommunitySchema())
 
 
-class PublishSchema(ma.SQLAlchemyAutoSchema):
+class PublishSchema(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Publish
         
 
-class StrengthSchema(ma.SQLAlchemyAutoSchema):
+class StrengthSchema(TimedDump, ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Strength
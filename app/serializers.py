@@ -0,0 +1,161 @@
+import json
+from datetime import date
+from flask import current_app
+from app.instrumentation import serializing
+from app.models import Book, Category, Comment, Community, Membership, Post, Review, Role, User, Visibility
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Projection:
+    """Columns to select for a response object, and how to rebuild it from a row.
+
+    Fields map output keys to a column, or to a nested Projection for a related
+    object which comes out as None when its first column (the primary key) is
+    NULL. Rows may carry extra trailing columns, such as pagination keys.
+    """
+
+    def __init__(self, **fields):
+        self.columns = []
+        self._flat = []
+        self._nested = []
+
+        for key, field in fields.items():
+            if isinstance(field, Projection):
+                self._nested.append((key, field, len(self.columns)))
+                self.columns.extend(field.columns)
+            else:
+                self._flat.append((key, len(self.columns)))
+                self.columns.append(field)
+
+    def load(self, row, start=0):
+        result = {key: row[start + i] for key, i in self._flat}
+
+        for key, projection, i in self._nested:
+            result[key] = None if row[start + i] is None else projection.load(row, start + i)
+
+        return result
+
+    def load_many(self, rows):
+        return [self.load(row) for row in rows]
+
+
+# ? Same output as the marshmallow schemas in app/schemas.py
+user_projection = Projection(
+    id=User.id,
+    email=User.email,
+    name=User.name,
+    member_since=User.member_since,
+    bio=User.bio,
+    born=User.born,
+    website=User.website,
+    social_media=User.social_media,
+    avatar=User.avatar,
+    is_author=User.is_author
+)
+
+book_projection = Projection(
+    id=Book.id,
+    title=Book.title,
+    description=Book.description,
+    cover=Book.cover
+)
+
+community_projection = Projection(
+    id=Community.id,
+    name=Community.name,
+    description=Community.description,
+    restrict_posting=Community.restrict_posting,
+    visibility=Projection(id=Visibility.id, type=Visibility.type),
+    category=Projection(id=Category.id, type=Category.type)
+)
+
+membership_projection = Projection(
+    id=Membership.id,
+    profile=user_projection,
+    role=Projection(id=Role.id, type=Role.type),
+    community=community_projection
+)
+
+
+# ? Rows answering every attribute the get_*_info helper of their model reads,
+# ? so Post.get_post_info(row) works on them as it does on an entity
+post_columns = (
+    Post.id,
+    Post.content,
+    Post.turn_off_commenting,
+    Post.author_id,
+    Post.community_id,
+    User.name.label('author_name')
+)
+
+comment_columns = (
+    Comment.id,
+    Comment.user_id,
+    Comment.post_id,
+    Comment.content,
+    User.name.label('author_name')
+)
+
+review_columns = (
+    Review.id,
+    Review.user_id,
+    Review.book_id,
+    Review.overview,
+    Review.content,
+    Review.star,
+    Review.started,
+    Review.finished,
+    User.name.label('author_name')
+)
+
+
+def post_query():
+    return Post.query.with_entities(*post_columns).outerjoin(User, Post.author_id == User.id)
+
+
+def comment_query():
+    return Comment.query.with_entities(*comment_columns).outerjoin(User, Comment.user_id == User.id)
+
+
+def review_query():
+    return Review.query.with_entities(*review_columns).outerjoin(User, Review.user_id == User.id)
+
+
+def with_community(query):
+    """Join the visibility and category rows pointing at Community."""
+    return query \
+        .outerjoin(Visibility, Visibility.community_id == Community.id) \
+        .outerjoin(Category, Category.community_id == Community.id)
+
+
+def membership_query():
+    return with_community(
+        Membership.query.with_entities(*membership_projection.columns)
+        .outerjoin(User, Membership.user_id == User.id)
+        .outerjoin(Role, Membership.role_id == Role.id)
+        .outerjoin(Community, Membership.community_id == Community.id)
+    )
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    # ? URLType columns come back as furl objects when furl is installed
+    return str(value)
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def json_response(obj, status=200):
+    """jsonify for the projected list endpoints, encoding with orjson when installed."""
+    with serializing():
+        body = dumps(obj)
+    return current_app.response_class(body, status=status, mimetype='application/json')
@@ -0,0 +1,212 @@
+import atexit
+from datetime import date, datetime, timedelta
+from functools import wraps
+from threading import Event, Lock, Thread
+from flask import current_app, make_response
+from sqlalchemy import and_, bindparam, case, func, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app import db, response_cache
+from app.models import Book, BookActivity, BookTrending
+
+
+def upsert_activity(connection, rows):
+    """Add the views and reviews of rows to the stored (book_id, day) counters."""
+    table = BookActivity.__table__
+
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.book_id, table.c.day],
+            set_={
+                'views': table.c.views + statement.excluded.views,
+                'reviews': table.c.reviews + statement.excluded.reviews
+            }
+        ), rows)
+        return
+
+    keys = [(row['book_id'], row['day']) for row in rows]
+    existing = set(connection.execute(
+        db.select(table.c.book_id, table.c.day).where(tuple_(table.c.book_id, table.c.day).in_(keys))
+    ))
+    updates = [{**row, 'b_book_id': row['book_id'], 'b_day': row['day']}
+               for row in rows if (row['book_id'], row['day']) in existing]
+
+    if updates:
+        connection.execute(
+            table.update()
+            .where(and_(table.c.book_id == bindparam('b_book_id'), table.c.day == bindparam('b_day')))
+            .values(views=table.c.views + bindparam('views'), reviews=table.c.reviews + bindparam('reviews')),
+            updates
+        )
+    inserts = [row for row in rows if (row['book_id'], row['day']) not in existing]
+    if inserts:
+        connection.execute(table.insert(), inserts)
+
+
+class ActivityCounter:
+    """Per worker counts of book views and reviews, written to book_activity in batches.
+
+    record() only touches a dict. A background thread upserts the pending
+    counts every TRENDING_FLUSH_INTERVAL seconds, or as soon as
+    TRENDING_FLUSH_SIZE (book, day) pairs are pending, in one transaction, and
+    recomputes the trending list once it is older than TRENDING_INTERVAL.
+    Counts still pending when the worker exits are flushed at exit, a killed
+    worker loses at most one interval of them.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.worker = None
+        self.flushed = 0
+        self.failed = 0
+        self._wake = Event()
+        self._lock = Lock()
+
+    def start(self, app):
+        with self._lock:
+            if self.worker:
+                return
+
+            self.worker = Thread(target=self._work, args=(app,), name='activity', daemon=True)
+            self.worker.start()
+            atexit.register(self._flush_at_exit, app)
+
+    def record(self, book_id, views=0, reviews=0):
+        app = current_app._get_current_object()
+        self.start(app)
+        key = (int(book_id), date.today())
+
+        with self._lock:
+            counts = self.pending.get(key, (0, 0))
+            self.pending[key] = (counts[0] + views, counts[1] + reviews)
+            full = len(self.pending) >= app.config['TRENDING_FLUSH_SIZE']
+
+        if full:
+            self._wake.set()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'flushed': self.flushed,
+            'failed': self.failed
+        }
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        # ? Books deleted since they were viewed would fail the whole batch
+        ids = {book_id for book_id, _ in pending}
+        ids = {id for id, in db.session.query(Book.id).filter(Book.id.in_(ids))}
+        rows = [
+            {'book_id': book_id, 'day': day, 'views': views, 'reviews': reviews}
+            for (book_id, day), (views, reviews) in pending.items() if book_id in ids
+        ]
+
+        try:
+            if rows:
+                upsert_activity(db.session.connection(), rows)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            self.failed += len(rows)
+            current_app.logger.exception(f'Could not write the activity of {len(rows)} books.')
+            return 0
+
+        self.flushed += len(rows)
+        return len(rows)
+
+    def _work(self, app):
+        with app.app_context():
+            while True:
+                self._wake.wait(app.config['TRENDING_FLUSH_INTERVAL'])
+                self._wake.clear()
+
+                try:
+                    self.flush()
+                    if trending_is_stale():
+                        compute_trending()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Activity flush failed.')
+                finally:
+                    db.session.remove()
+
+    def _flush_at_exit(self, app):
+        with app.app_context():
+            self.flush()
+            db.session.remove()
+
+
+activity = ActivityCounter()
+
+
+def counts_views(f):
+    """Count a view of the book for every successful response, cached or not."""
+    @wraps(f)
+    def wrapper(book_id):
+        response = make_response(f(book_id=book_id))
+
+        if response.status_code == 200:
+            activity.record(book_id, views=1)
+
+        return response
+    return wrapper
+
+
+def trending_is_stale():
+    computed_at = db.session.query(func.max(BookTrending.computed_at)).scalar()
+    interval = timedelta(seconds=current_app.config['TRENDING_INTERVAL'])
+    return computed_at is None or computed_at < datetime.utcnow() - interval
+
+
+def compute_trending():
+    """Replace book_trending with the TRENDING_SIZE books of highest time-decayed activity.
+
+    A day's views plus TRENDING_REVIEW_WEIGHT times its reviews count fully
+    today and half as much every TRENDING_HALF_LIFE days, over the last
+    TRENDING_WINDOW days.
+    """
+    config = current_app.config
+    today = date.today()
+    weights = {
+        today - timedelta(days=n): 0.5 ** (n / config['TRENDING_HALF_LIFE'])
+        for n in range(config['TRENDING_WINDOW'])
+    }
+    score = func.sum(
+        (BookActivity.views + config['TRENDING_REVIEW_WEIGHT'] * BookActivity.reviews)
+        * case(weights, value=BookActivity.day, else_=0)
+    )
+
+    rows = db.session.query(BookActivity.book_id, score) \
+        .filter(BookActivity.day > today - timedelta(days=config['TRENDING_WINDOW'])) \
+        .group_by(BookActivity.book_id) \
+        .order_by(score.desc(), BookActivity.book_id) \
+        .limit(config['TRENDING_SIZE']) \
+        .all()
+
+    computed_at = datetime.utcnow()
+
+    try:
+        BookTrending.query.delete()
+        if rows:
+            db.session.execute(BookTrending.__table__.insert(), [
+                {'book_id': book_id, 'rank': rank, 'score': float(score), 'computed_at': computed_at}
+                for rank, (book_id, score) in enumerate(rows, 1)
+            ])
+        db.session.commit()
+    except IntegrityError:
+        # ? Another worker recomputed the list at the same time
+        db.session.rollback()
+        return 0
+
+    response_cache.invalidate('book_trending')
+    return len(rows)
@@ -4,6 +4,16 @@ from datetime import datetime
 from flask import current_app
 
 
+# Regex to check valid URL, compiled once at import
+URL_REGEX = re.compile(
+    "((http|https)://)(www.)?" +
+    "[a-zA-Z0-9@:%._\\+~#?&//=]" +
+    "{2,256}\\.[a-z]" +
+    "{2,6}\\b([-a-zA-Z0-9@:%" +
+    "._\\+~#?&//=]*)"
+)
+
+
 def validate_mail(email):
     try:
         email_validator.validate_email(email)
@@ -13,24 +23,12 @@ def validate_mail(email):
 
 
 def is_valid_url(url):
-    # Regex to check valid URL
-    regex = ("((http|https)://)(www.)?" +
-             "[a-zA-Z0-9@:%._\\+~#?&//=]" +
-             "{2,256}\\.[a-z]" +
-             "{2,6}\\b([-a-zA-Z0-9@:%" +
-             "._\\+~#?&//=]*)")
-
-    # Compile the ReGex
-    compiler = re.compile(regex)
-
     # Return False if url is empty
     if url == None:
         return False
 
     # Return if the string matched the ReGex
-    if re.search(compiler, url):
-        return True
-    return False
+    return URL_REGEX.search(url) is not None
 
 
 def validate_date(d):
@@ -41,5 +39,9 @@ def validate_date(d):
         return False
 
 
+def parse_date(d):
+    return datetime.strptime(d, "%Y-%m-%d").date()
+
+
 def is_allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[-1].lower() in current_app.config['ALLOWED_EXTENSIONS']
@@ -0,0 +1,104 @@
+from schema import Schema, And, Use
+from app.utils import validate_mail, validate_date, is_valid_url
+
+
+# ? Request payload schemas, built once at import and shared by every request.
+# ? Schema.validate keeps no state between calls so they are safe to reuse.
+
+def min_length(n):
+    def check(value):
+        return len(value) >= n
+    return check
+
+
+def max_length(n):
+    def check(value):
+        return len(value) <= n
+    return check
+
+
+def length_between(low, high):
+    def check(value):
+        return low <= len(value) <= high
+    return check
+
+
+def is_star(value):
+    return 0 <= value <= 5
+
+
+register_schema = Schema({
+    'email': And(Use(str), validate_mail, error='Invalid email'),
+    'password': And(Use(str), min_length(6), error='Password must be at least 6 characters'),
+    'name': And(Use(str), min_length(2), error='Name must be at least 2 characters')
+})
+
+login_schema = Schema({
+    'email': And(Use(str), validate_mail, error='Invalid email.'),
+    'password': And(Use(str), min_length(6), error='Password must be at least 6 characters.')
+})
+
+# ? Profile fields are optional and validated one at a time by user_update
+profile_schemas = {
+    'name': Schema({
+        'name': And(Use(str), min_length(2), error='Name must be at least 2 characters.')
+    }),
+    'social_media': Schema({
+        'social_media': And(Use(str), is_valid_url, error='Social media must be a valid url link.')
+    }),
+    'bio': Schema({
+        'bio': And(Use(str), max_length(250), error='Bio must not be more than 250 characters.')
+    }),
+    'born': Schema({
+        'born': And(Use(str), max_length(100), error='Bio must not be more than 100 characters.')
+    }),
+    'website': Schema({
+        'website': And(Use(str), is_valid_url, error='Website must be a valid url link.')
+    })
+}
+
+user_genre_schema = Schema({
+    'type': And(Use(str), max_length(20), error='Type must not be more than 20 characters.')
+})
+
+book_genre_schema = Schema({
+    'type': And(Use(str), max_length(20), error='Genre type must not be more than 20 characters.')
+})
+
+review_schema = Schema({
+    'content': Use(str),
+    'overview': And(Use(str), max_length(50), error='Overview must not be over 50 characters.'),
+    'star': And(Use(int), is_star, error='Star must be in between 0 to 5 stars.'),
+    'started': And(Use(str), validate_date, error='Invalid starting date.'),
+    'finished': And(Use(str), validate_date, error='Invalid finishing date.')
+})
+
+community_schema = Schema({
+    'name': And(
+        Use(str),
+        length_between(5, 100),
+        error='Community name must be between 5 and 100 characters.'
+    ),
+    'description': And(Use(str), max_length(100), error='Description must not be more than 100 characters.'),
+    'restrict_posting': And(Use(bool), error='Restrict posting must be a boolean.'),
+    'visibility': Use(str),
+    'category': Use(str)
+})
+
+post_schema = Schema({
+    'content': And(Use(str), error='Content must be text.'),
+    'turn_off_commenting': And(Use(bool), error='Commenting option must be a boolean.')
+})
+
+comment_schema = Schema({
+    'content': And(Use(str), error='Comment content must be text.')
+})
+
+member_schema = Schema({
+    'user_id': And(Use(int), error='User_id must be an integer.'),
+    'role': And(Use(str), error='Must be a valid role.')
+})
+
+member_role_schema = Schema({
+    'role': And(Use(str), error='Must be a valid role.')
+})
@@ -0,0 +1,91 @@
+"""Bytes sent for repeat views of a page of book covers.
+
+Uploads --covers random covers through the API, then replays --views views of
+a page showing all of them and counts body and header bytes for three clients:
+one that ignores caching (what every client got before ETag/Cache-Control),
+one that revalidates every image with If-None-Match, and one that honours
+Cache-Control: immutable. The same is repeated for ?size=thumbnail.
+
+    python benchmarks/image_caching.py --covers 20 --views 50
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def response_bytes(response):
+    headers = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    return headers + len(response.get_data())
+
+
+def replay(client, urls, views, mode):
+    cache = {}
+    total = 0
+    requests = 0
+
+    for _ in range(views):
+        for url in urls:
+            if mode == 'immutable' and url in cache:
+                continue
+
+            headers = {}
+            if mode in ('revalidate', 'immutable') and url in cache:
+                headers['If-None-Match'] = cache[url]
+
+            response = client.get(url, headers=headers)
+            requests += 1
+            total += response_bytes(response)
+
+            if mode != 'none' and 'ETag' in response.headers:
+                cache[url] = response.headers['ETag']
+
+    return requests, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--covers', type=int, default=20)
+    parser.add_argument('--views', type=int, default=50)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(folder, "bench.db")}'
+    os.environ['IMAGE_FOLDER_DIR'] = os.path.join(folder, 'images')
+
+    from PIL import Image
+    from app import create_app, db
+    from app.images import generate_variants
+
+    app = create_app()
+    client = app.test_client()
+    urls = []
+
+    with app.app_context():
+        db.create_all()
+
+        for _ in range(args.covers):
+            # ? Noise compresses badly, like a real photo cover
+            image = Image.effect_noise((800, 1200), random.randint(20, 80)).convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=90)
+            name = f'{os.urandom(16).hex()}.jpg'
+            with open(os.path.join(app.config['IMAGE_FOLDER_DIR'], name), 'wb') as f:
+                f.write(buffer.getvalue())
+            generate_variants(app.config['IMAGE_FOLDER_DIR'], name, app.config['IMAGE_QUALITY'])
+            urls.append(f'/api/images/{name}')
+
+    print(f'{args.covers} covers, {args.views} views of the page')
+    print(f'{"variant":<12}{"client":<14}{"requests":>10}{"MB sent":>10}')
+    for suffix, label in (('', 'original'), ('?size=thumbnail', 'thumbnail')):
+        for mode in ('none', 'revalidate', 'immutable'):
+            requests, total = replay(client, [u + suffix for u in urls], args.views, mode)
+            print(f'{label:<12}{mode:<14}{requests:>10}{total / 1024 / 1024:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Latency percentiles of one endpoint under many concurrent connections, per gunicorn worker class.
+
+For every --worker-class a gunicorn is started with gunicorn.conf.py on
+--port, --connections keep-alive clients then request --path for --duration
+seconds. Requests that fail or take longer than --timeout are counted as
+errors. The access token is minted for --user-id with the app's JWT key, so
+run it against the same DATABASE_URL as the server. 1000 connections need a
+file descriptor limit above 1024 (ulimit -n 4096).
+
+    python benchmarks/load_test.py --path /api/books/1 --connections 1000 --worker-class sync --worker-class gevent
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def client(host, port, request, deadline, timeout, latencies, errors):
+    reader = writer = None
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+
+            writer.write(request)
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+            headers = head.decode('latin-1').lower()
+            length = 0
+            for line in headers.split('\r\n'):
+                if line.startswith('content-length:'):
+                    length = int(line.split(':', 1)[1])
+            await asyncio.wait_for(reader.readexactly(length), timeout)
+
+            if headers.startswith('http/1.1 200') or headers.startswith('http/1.0 200'):
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors['status'] += 1
+
+            # ? Sync workers close the connection after every response
+            if 'connection: close' in headers:
+                writer.close()
+                writer = None
+        except asyncio.TimeoutError:
+            errors['timeout'] += 1
+            writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            errors['connection'] += 1
+            writer = None
+            await asyncio.sleep(0.05)
+
+    if writer is not None:
+        writer.close()
+
+
+async def load(args, token):
+    request = (
+        f'GET {args.path} HTTP/1.1\r\n'
+        f'Host: {args.host}:{args.port}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        f'\r\n'
+    ).encode()
+    latencies = []
+    errors = {'status': 0, 'timeout': 0, 'connection': 0}
+    deadline = time.perf_counter() + args.duration
+
+    await asyncio.gather(*(
+        client(args.host, args.port, request, deadline, args.timeout, latencies, errors)
+        for _ in range(args.connections)
+    ))
+    return sorted(latencies), errors
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Nothing is listening on {host}:{port}.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--path', default='/api/books/1')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed.')
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--worker-class', action='append',
+                        help='Start gunicorn with this worker class, repeatable. Without it, load the running server.')
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+
+    with create_app().app_context():
+        token = create_access_token(identity=args.user_id)
+
+    print(f'{args.connections} connections, {args.duration:.0f}s, GET {args.path}')
+    print(f'{"worker class":<14}{"req/s":>9}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}{"errors":>9}')
+
+    for worker_class in args.worker_class or [None]:
+        server = None
+        if worker_class:
+            env = dict(os.environ, WEB_WORKER_CLASS=worker_class, WEB_CONCURRENCY=str(args.workers))
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                 '-b', f'{args.host}:{args.port}', '--backlog', '2048', 'manage:app'],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        try:
+            wait_for_port(args.host, args.port)
+            latencies, errors = asyncio.run(load(args, token))
+        finally:
+            if server:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+
+        ms = [percentile(latencies, p) * 1000 for p in (50, 90, 99)]
+        print(f'{worker_class or "running":<14}{len(latencies) / args.duration:>9.0f}'
+              f'{ms[0]:>9.1f}{ms[1]:>9.1f}{ms[2]:>9.1f}{sum(errors.values()):>9}')
+
+
+if __name__ == '__main__':
+    main()
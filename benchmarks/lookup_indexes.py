@@ -0,0 +1,113 @@
+"""Lookup latency on the hot foreign-key columns, before and after their indexes.
+
+Seeds a throwaway SQLite database with --rows rows in every association table,
+times each lookup the API performs without the indexes added in migration
+d94b6f2a1c38, then creates them and times the same lookups again.
+
+    python benchmarks/lookup_indexes.py --rows 2000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOOKUPS = [
+    ('review by book', 'SELECT id FROM review WHERE book_id = ?', ('book',)),
+    ('post by community', 'SELECT id FROM post WHERE community_id = ?', ('community',)),
+    ('comment by post', 'SELECT id FROM comment WHERE post_id = ?', ('post',)),
+    ('members of community', 'SELECT id FROM membership WHERE community_id = ?', ('community',)),
+    ('membership', 'SELECT id FROM membership WHERE user_id = ? AND community_id = ?', ('user', 'community')),
+    ('publisher of book', 'SELECT id FROM publish WHERE book_id = ?', ('book',)),
+    ('book genre', 'SELECT id FROM bookgenre WHERE book_id = ? AND genre_id = ?', ('book', 'genre')),
+    ('user strength', 'SELECT id FROM strength WHERE user_id = ? AND genre_id = ?', ('user', 'genre')),
+]
+
+
+def seed(connection, rows, sizes):
+    tables = {
+        'review': ('user_id', 'book_id'),
+        'post': ('author_id', 'community_id'),
+        'comment': ('user_id', 'post_id'),
+        'membership': ('user_id', 'community_id'),
+        'publish': ('user_id', 'book_id'),
+        'bookgenre': ('book_id', 'genre_id'),
+        'strength': ('user_id', 'genre_id'),
+    }
+    kinds = {
+        'user_id': 'user', 'author_id': 'user', 'book_id': 'book',
+        'community_id': 'community', 'post_id': 'post', 'genre_id': 'genre',
+    }
+
+    for table, columns in tables.items():
+        # ? Unique pairs so the unique indexes can be built afterwards
+        pairs = set()
+        while len(pairs) < rows:
+            pairs.add(tuple(random.randint(1, sizes[kinds[c]]) for c in columns))
+
+        connection.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES (?, ?)', list(pairs)
+        )
+        connection.commit()
+
+
+def measure(connection, sizes, samples):
+    results = {}
+    for name, sql, kinds in LOOKUPS:
+        params = [tuple(random.randint(1, sizes[k]) for k in kinds) for _ in range(samples)]
+        start = time.perf_counter()
+        for p in params:
+            connection.execute(sql, p).fetchall()
+        results[name] = (time.perf_counter() - start) / samples * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        added = [
+            index for table in db.metadata.sorted_tables for index in table.indexes
+            if index.name not in ('ix_users_email', 'ix_community_name')
+        ]
+        for index in added:
+            index.drop(db.engine)
+
+    # ? Few parents per child so every lookup returns a realistic handful of rows
+    sizes = {
+        'user': args.rows // 10, 'book': args.rows // 20, 'community': args.rows // 500,
+        'post': args.rows // 20, 'genre': 100,
+    }
+
+    connection = sqlite3.connect(path)
+    seed(connection, args.rows, sizes)
+    before = measure(connection, sizes, args.samples)
+
+    with app.app_context():
+        for index in added:
+            index.create(db.engine)
+
+    after = measure(connection, sizes, args.samples)
+
+    print(f'{args.rows} rows per table, mean of {args.samples} lookups')
+    print(f'{"lookup":<24}{"before ms":>12}{"after ms":>12}{"speedup":>10}')
+    for name, _, _ in LOOKUPS:
+        print(f'{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
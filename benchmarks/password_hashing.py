@@ -0,0 +1,85 @@
+"""Login throughput of one worker, hashing inline versus on the password process pool.
+
+--threads threads check the same password concurrently, as the threads or
+greenlets of a gthread/gevent worker would during a login burst. Meanwhile
+another thread times a small pure-Python task, standing in for the unrelated
+reads the worker serves at the same time. Each --method is a werkzeug
+method, so the cost of several iteration counts can be compared in one run.
+
+    python benchmarks/password_hashing.py --threads 16 --processes 4 --method pbkdf2:sha256:260000 --method pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=200, help='Logins per variant.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--method', action='append', help='werkzeug hash method, repeatable.')
+    args = parser.parse_args()
+
+    from flask import Flask
+    from config import Config
+    from app.passwords import PasswordHasher
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['PASSWORD_QUEUE_SIZE'] = args.threads
+    cores = os.cpu_count()
+
+    def run(method, processes):
+        app.config['PASSWORD_HASH_METHOD'] = method
+        app.config['PASSWORD_PROCESSES'] = processes
+        hasher = PasswordHasher()
+
+        with app.app_context():
+            pwhash = hasher.hash('correct horse battery staple')
+
+        def login(_):
+            with app.app_context():
+                return hasher.check(pwhash, 'correct horse battery staple')
+
+        latencies = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                start = time.perf_counter()
+                sum(i * i for i in range(2000))
+                latencies.append(time.perf_counter() - start)
+                time.sleep(0.005)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            assert all(executor.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        reader.join()
+
+        if hasher._pool:
+            hasher._pool.shutdown()
+
+        used = min(processes, cores) if processes else 1
+        return args.logins / elapsed, args.logins / elapsed / used, statistics.median(latencies) * 1000
+
+    print(f'{cores} cores, {args.threads} threads, {args.logins} logins per variant')
+    print(f'{"method":<24}{"processes":>10}{"logins/s":>11}{"per core":>10}{"read p50 ms":>13}')
+    for method in args.method or ['pbkdf2:sha256:260000']:
+        for processes in (0, args.processes):
+            rate, per_core, read = run(method, processes)
+            print(f'{method:<24}{processes:>10}{rate:>11.1f}{per_core:>10.1f}{read:>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
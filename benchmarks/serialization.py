@@ -0,0 +1,125 @@
+"""Serialization cost of community_member_list and search_users at --rows rows per page.
+
+Seeds a throwaway SQLite database with --rows users, all members of one
+community and all matching the search, then times one full page of each
+endpoint's query, serialization and JSON encoding: ORM entities dumped by
+marshmallow and jsonify as before, column tuples through app.serializers as
+now, with orjson and with the stdlib fallback.
+
+    python benchmarks/serialization.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'serialization.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['SEARCH_BACKEND'] = 'like'
+    os.environ['MAX_PAGE_SIZE'] = str(args.rows)
+
+    from datetime import date
+    from flask import jsonify
+    from sqlalchemy.orm import joinedload, selectinload
+    from app import create_app, db, serializers
+    from app.api.pagination import paginate
+    from app.fulltext import search
+    from app.models import Category, Community, Membership, Role, User, Visibility
+    from app.schemas import MembershipSchema, UserSchema
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Role(type='Member'))
+        db.session.add(Community(id=1, name='Benchmark', description='d', restrict_posting=False))
+        db.session.add(Visibility(type='Public', community_id=1))
+        db.session.add(Category(type='Books', community_id=1))
+        db.session.commit()
+        db.session.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'reader{i}@example.com', 'name': f'Reader {i}', 'member_since': date.today(),
+             'bio': 'Reads a lot. ' * 10, 'website': 'https://example.com', 'is_author': False}
+            for i in range(1, args.rows + 1)
+        ])
+        db.session.execute(Membership.__table__.insert(), [
+            {'user_id': i, 'community_id': 1, 'role_id': 1} for i in range(1, args.rows + 1)
+        ])
+        db.session.commit()
+
+    membership_plan = (
+        joinedload(Membership.profile),
+        joinedload(Membership.role),
+        joinedload(Membership.community).selectinload(Community.visibility),
+        joinedload(Membership.community).selectinload(Community.category)
+    )
+
+    def members_before():
+        members, next_cursor = paginate(
+            Membership.query.options(*membership_plan).filter_by(community_id=1), Membership.id
+        )
+        return jsonify({'members': MembershipSchema(many=True).dump(members), 'next_cursor': next_cursor})
+
+    def members_after():
+        members, next_cursor = paginate(
+            serializers.membership_query().filter(Membership.community_id == 1), Membership.id
+        )
+        return serializers.json_response({
+            'members': serializers.membership_projection.load_many(members),
+            'next_cursor': next_cursor
+        })
+
+    def users_before():
+        users, rank = search(User, 'example')
+        users, next_cursor = paginate(users, User.id, rank)
+        return jsonify({'users': UserSchema(many=True).dump(users), 'next_cursor': next_cursor})
+
+    def users_after():
+        users, rank = search(User, 'example')
+        users, next_cursor = paginate(users.with_entities(*serializers.user_projection.columns), User.id, rank)
+        return serializers.json_response({
+            'users': serializers.user_projection.load_many(users),
+            'next_cursor': next_cursor
+        })
+
+    encoder = serializers.orjson
+    cases = [
+        ('community_member_list', members_before, members_after),
+        ('search_users', users_before, users_after),
+    ]
+
+    print(f'{args.rows} rows per page')
+    print(f'{"endpoint":<24}{"marshmallow ms":>16}{"stdlib ms":>12}{"orjson ms":>12}')
+    with app.test_request_context(f'/?limit={args.rows}'):
+        for name, before, after in cases:
+            assert len(before().get_data()) and len(after().get_data())
+            b = timed(before, args.repeat)
+            db.session.expunge_all()
+
+            serializers.orjson = None
+            s = timed(after, args.repeat)
+            serializers.orjson = encoder
+            o = timed(after, args.repeat) if encoder else float('nan')
+
+            print(f'{name:<24}{b * 1e3:>16.1f}{s * 1e3:>12.1f}{o * 1e3:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
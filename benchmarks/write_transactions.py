@@ -0,0 +1,144 @@
+"""Write throughput of community creation and book deletion, committing once versus several times.
+
+Runs the unit of work of community_creation and book_deletion from --threads
+threads at once, first as the endpoints used to (three and two commits), then
+as they do now (one commit each). Every commit is an fsync on the server, so
+point --database-url at PostgreSQL for representative numbers, the default is
+a throwaway SQLite file.
+
+    python benchmarks/write_transactions.py --database-url postgresql://localhost/vivilio_bench --threads 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'writes.db')}")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=200, help='Operations per thread and variant.')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app, db
+    from app.models import Book, BookStats, Category, Community, Membership, Publish, Role, User, Visibility
+
+    app = create_app()
+    if args.database_url.startswith('sqlite'):
+        # ? SQLite serialises writers, wait for the lock instead of failing
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+
+    total = args.threads * args.operations
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([Role(type=t) for t in ('Creator', 'Admin', 'Member')])
+        db.session.add(Visibility(type='Public'))
+        db.session.add(Category(type='Books'))
+        db.session.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'writer{i}@example.com', 'name': f'Writer {i}'} for i in range(1, args.threads + 1)
+        ])
+        db.session.execute(Book.__table__.insert(), [
+            {'id': i, 'title': f'Book {i}', 'description': 'd', 'cover': f'/api/images/{i}.png'}
+            for i in range(1, 2 * total + 1)
+        ])
+        db.session.execute(Publish.__table__.insert(), [
+            {'user_id': i % args.threads + 1, 'book_id': i} for i in range(1, 2 * total + 1)
+        ])
+        db.session.execute(BookStats.__table__.insert(), [{'book_id': i} for i in range(1, 2 * total + 1)])
+        db.session.commit()
+
+    def create_community_before(user_id, n):
+        community = Community(
+            name=f'before {user_id} {n}',
+            description='d',
+            restrict_posting=False,
+            visibility=Visibility.query.filter_by(type='Public').first(),
+            category=Category.query.filter_by(type='Books').first()
+        )
+        db.session.add(community)
+        db.session.commit()
+
+        creator = Role.query.filter_by(type='Creator').first()
+        membership = Membership(user_id=user_id, community_id=community.id, role_id=creator.id)
+        db.session.add(membership)
+        db.session.commit()
+
+        community.members.append(membership)
+        db.session.commit()
+
+    def create_community_after(user_id, n):
+        community = Community(
+            name=f'after {user_id} {n}',
+            description='d',
+            restrict_posting=False,
+            visibility=Visibility.query.filter_by(type='Public').first(),
+            category=Category.query.filter_by(type='Books').first()
+        )
+        db.session.add(community)
+        db.session.flush()
+
+        creator = Role.query.filter_by(type='Creator').first()
+        db.session.add(Membership(user_id=user_id, community_id=community.id, role_id=creator.id))
+        db.session.commit()
+
+    def delete_book_before(book_id):
+        book = Book.query.filter_by(id=book_id).first()
+        publish = Publish.query.filter_by(book_id=book_id).first()
+
+        db.session.delete(publish)
+        db.session.commit()
+
+        BookStats.query.filter_by(book_id=book_id).delete()
+        db.session.delete(book)
+        db.session.commit()
+
+    def delete_book_after(book_id):
+        book = Book.query.filter_by(id=book_id).first()
+        publish = Publish.query.filter_by(book_id=book_id).first()
+
+        db.session.delete(publish)
+        BookStats.query.filter_by(book_id=book_id).delete()
+        db.session.delete(book)
+        db.session.commit()
+
+    def run(work):
+        def worker(thread):
+            with app.app_context():
+                for n in range(args.operations):
+                    work(thread, n)
+                db.session.remove()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            list(executor.map(worker, range(args.threads)))
+        return total / (time.perf_counter() - start)
+
+    def book_id(thread, n, variant):
+        return variant * total + thread * args.operations + n + 1
+
+    cases = [
+        ('community creation',
+         lambda t, n: create_community_before(t + 1, n),
+         lambda t, n: create_community_after(t + 1, n)),
+        ('book deletion',
+         lambda t, n: delete_book_before(book_id(t, n, 0)),
+         lambda t, n: delete_book_after(book_id(t, n, 1))),
+    ]
+
+    print(f'{args.threads} threads, {args.operations} operations each')
+    print(f'{"operation":<22}{"before ops/s":>14}{"after ops/s":>14}')
+    for name, before, after in cases:
+        print(f'{name:<22}{run(before):>14.0f}{run(after):>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
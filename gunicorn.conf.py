@@ -0,0 +1,38 @@
+"""Gunicorn settings, see the Procfile.
+
+WEB_WORKER_CLASS picks how a worker serves concurrent requests:
+- sync: one request at a time per worker (gunicorn's default)
+- gthread: WEB_THREADS threads per worker
+- gevent: up to WEB_WORKER_CONNECTIONS greenlets per worker, each blocking
+  call to the database, SMTP or disk yields to the others
+"""
+import os
+
+worker_class = os.getenv('WEB_WORKER_CLASS') or 'sync'
+workers = int(os.getenv('WEB_CONCURRENCY') or 1)
+threads = int(os.getenv('WEB_THREADS') or 8)
+worker_connections = int(os.getenv('WEB_WORKER_CONNECTIONS') or 1000)
+timeout = int(os.getenv('WEB_TIMEOUT') or 30)
+# ? Import the app once in the master, workers then share its memory
+preload_app = bool(os.getenv('WEB_PRELOAD'))
+
+if worker_class == 'gevent':
+    # ? Patch before the app is imported, so the locks, events and queues its
+    # ? modules create at import time cooperate with greenlets
+    from gevent import monkey
+    monkey.patch_all()
+
+    # ? psycopg2 is a C extension, make its waits yield to other greenlets too
+    if (os.getenv('DATABASE_URL') or '').startswith('postgres'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def pre_fork(server, worker):
+    # ? Workers must not inherit the master's database connections
+    if preload_app:
+        from manage import app
+        from app import db
+
+        with app.app_context():
+            db.engine.dispose()
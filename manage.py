@@ -1,5 +1,12 @@
-from app import create_app, db
-from app.models import User, Book, Category, Comment, Community, Genre, Membership, Post, Review, Publish, Strength, Role, Visibility, BookGenre
+import time
+import click
+from flask import current_app
+from sqlalchemy import case, func
+from app import create_app, db, fulltext
+from app.analytics.reviews import classify_many, POSITIVE, NEGATIVE
+from app.catalog import CatalogImport, batches, read_records
+from app.trending import compute_trending
+from app.models import User, Book, BookActivity, BookStats, BookTrending, Category, Comment, Community, Genre, Membership, Post, Review, Publish, Strength, Role, Visibility, BookGenre
 
 app = create_app()
 
@@ -23,5 +30,131 @@ def make_shell_context():
         'Strength': Strength, 
         'Role': Role, 
         'Visibility': Visibility,
-        'BookGenre': BookGenre
-    }
\ No newline at end of file
+        'BookGenre': BookGenre,
+        'BookStats': BookStats,
+        'BookActivity': BookActivity,
+        'BookTrending': BookTrending
+    }
+
+
+@app.cli.command('backfill-sentiment')
+@click.option('--batch-size', default=1000, help='Number of reviews classified per commit.')
+def backfill_sentiment(batch_size):
+    """Store the sentiment label of reviews written before it was tracked."""
+    last_id = 0
+    total = 0
+    # ? Batches are smaller than the pool threshold, so weigh it against the whole backlog
+    remaining = Review.query.filter(Review.sentiment.is_(None)).count()
+    threshold = current_app.config['SENTIMENT_POOL_THRESHOLD']
+    if remaining >= threshold:
+        threshold = 0
+
+    while True:
+        rows = db.session.query(Review.id, Review.overview) \
+            .filter(Review.sentiment.is_(None)) \
+            .filter(Review.id > last_id) \
+            .order_by(Review.id) \
+            .limit(batch_size) \
+            .all()
+
+        if not rows:
+            break
+
+        sentiments = classify_many(
+            [row.overview for row in rows],
+            processes=current_app.config['SENTIMENT_PROCESSES'],
+            threshold=threshold
+        )
+        db.session.bulk_update_mappings(Review, [
+            {'id': row.id, 'sentiment': sentiment} for row, sentiment in zip(rows, sentiments)
+        ])
+        db.session.commit()
+
+        last_id = rows[-1].id
+        total += len(rows)
+
+    click.echo(f'Backfilled sentiment for {total} reviews.')
+
+
+@app.cli.command('rebuild-book-stats')
+@click.option('--check', is_flag=True, help='Only report books whose stored statistics are out of date.')
+def rebuild_book_stats(check):
+    """Recompute every book_stats row from the review table."""
+    if db.engine.dialect.name == 'sqlite':
+        duration = func.julianday(Review.finished) - func.julianday(Review.started)
+    else:
+        duration = Review.finished - Review.started
+
+    rows = db.session.query(
+        Review.book_id,
+        func.count(Review.id),
+        func.coalesce(func.sum(Review.star), 0),
+        func.coalesce(func.sum(duration), 0),
+        func.count(duration),
+        func.sum(case((Review.sentiment == POSITIVE, 1), else_=0)),
+        func.sum(case((Review.sentiment == NEGATIVE, 1), else_=0))
+    ).filter(Review.book_id.isnot(None)).group_by(Review.book_id).all()
+
+    expected = {
+        row[0]: dict(zip(BookStats.COUNTERS, (int(value) for value in row[1:])))
+        for row in rows
+    }
+    stored = {
+        stats.book_id: {c: getattr(stats, c) for c in BookStats.COUNTERS}
+        for stats in BookStats.query.all()
+    }
+    empty = dict.fromkeys(BookStats.COUNTERS, 0)
+    stale = [
+        book_id for book_id in set(expected) | set(stored)
+        if expected.get(book_id, empty) != stored.get(book_id, empty)
+    ]
+
+    click.echo(f'{len(stale)} of {len(expected)} reviewed books have stale statistics.')
+
+    if check or not stale:
+        return
+
+    for book_id in stale:
+        BookStats.query.filter_by(book_id=book_id).delete()
+        db.session.add(BookStats(book_id=book_id, **expected.get(book_id, empty)))
+    db.session.commit()
+
+    click.echo(f'Rebuilt statistics for {len(stale)} books.')
+
+
+@app.cli.command('compute-trending')
+def compute_trending_command():
+    """Recompute the trending books from the recorded views and reviews."""
+    click.echo(f'{compute_trending()} trending books.')
+
+
+@app.cli.command('reindex-search')
+def reindex_search():
+    """Rebuild the full-text search index from the book, users and community tables."""
+    fulltext.reindex()
+    click.echo('Search index rebuilt.')
+
+
+@app.cli.command('import-catalog')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--covers', 'covers_dir', required=True, type=click.Path(exists=True, file_okay=False),
+              help='Directory holding the cover files named in the catalog.')
+@click.option('--batch-size', default=1000, help='Number of books inserted per commit.')
+def import_catalog(path, covers_dir, batch_size):
+    """Stream books, their genres and publishers from a .csv or .jsonl catalog."""
+    job = CatalogImport(covers_dir)
+    start = time.perf_counter()
+
+    for batch in batches(read_records(path, job.skip_line), batch_size):
+        job.run(batch)
+        elapsed = time.perf_counter() - start
+        click.echo(f'{job.imported} books imported, {job.imported / elapsed:.0f} books/s')
+
+    elapsed = time.perf_counter() - start
+    click.echo(f'Imported {job.imported} books in {elapsed:.1f}s ({job.imported / max(elapsed, 1e-9):.0f} books/s).')
+    for reason, count in job.skipped.items():
+        click.echo(f'Skipped {count} records: {reason}.')
+    if job.bad_lines:
+        click.echo(f"Unreadable lines: {', '.join(map(str, job.bad_lines))}.")
+    if job.unknown_genres:
+        click.echo(f'Ignored {job.unknown_genres} unknown genres.')
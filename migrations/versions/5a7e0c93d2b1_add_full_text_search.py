@@ -0,0 +1,46 @@
+"""add full text search
+
+Revision ID: 5a7e0c93d2b1
+Revises: 8c2d41e7a5f0
+Create Date: 2026-10-18 14:03:26.774159
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7e0c93d2b1'
+down_revision = '8c2d41e7a5f0'
+branch_labels = None
+depends_on = None
+
+
+# ? Must stay in sync with FIELDS in app/fulltext.py
+FIELDS = {
+    'book': ('title',),
+    'users': ('name', 'email'),
+    'community': ('name',),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    for table, fields in FIELDS.items():
+        if dialect == 'postgresql':
+            document = " || ' ' || ".join(f"coalesce({table}.{f}, '')" for f in fields)
+            op.execute(f"CREATE INDEX ix_{table}_fts ON {table} USING gin (to_tsvector('simple', {document}))")
+        elif dialect == 'sqlite':
+            op.execute(f'CREATE VIRTUAL TABLE {table}_fts USING fts5({", ".join(fields)})')
+            op.execute(f'INSERT INTO {table}_fts (rowid, {", ".join(fields)}) SELECT id, {", ".join(fields)} FROM {table}')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    for table in FIELDS:
+        if dialect == 'postgresql':
+            op.drop_index(f'ix_{table}_fts', table_name=table)
+        elif dialect == 'sqlite':
+            op.execute(f'DROP TABLE {table}_fts')
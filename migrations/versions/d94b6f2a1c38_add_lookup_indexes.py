@@ -0,0 +1,52 @@
+"""add lookup indexes
+
+Revision ID: d94b6f2a1c38
+Revises: 5a7e0c93d2b1
+Create Date: 2026-10-18 16:21:54.309671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd94b6f2a1c38'
+down_revision = '5a7e0c93d2b1'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_review_book_id', 'review', ['book_id'], False),
+    ('ix_post_community_id', 'post', ['community_id'], False),
+    ('ix_comment_post_id', 'comment', ['post_id'], False),
+    ('ix_membership_community_id', 'membership', ['community_id'], False),
+    ('ix_membership_user_id_community_id', 'membership', ['user_id', 'community_id'], True),
+    ('ix_publish_book_id', 'publish', ['book_id'], False),
+    ('ix_publish_user_id_book_id', 'publish', ['user_id', 'book_id'], True),
+    ('ix_bookgenre_book_id_genre_id', 'bookgenre', ['book_id', 'genre_id'], True),
+    ('ix_strength_user_id_genre_id', 'strength', ['user_id', 'genre_id'], True),
+]
+
+
+def upgrade():
+    # ? Association rows were never checked for duplicates, keep the oldest one.
+    # ? Rows with a NULL key never collide in a unique index, leave them alone
+    for _, table, columns, unique in INDEXES:
+        if unique:
+            not_null = ' AND '.join(f'{c} IS NOT NULL' for c in columns)
+            op.execute(
+                f'DELETE FROM {table} WHERE {not_null} AND id NOT IN '
+                f'(SELECT MIN(id) FROM {table} WHERE {not_null} GROUP BY {", ".join(columns)})'
+            )
+
+    # ? Build concurrently on Postgres so large tables stay writable meanwhile
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+# ? Config reads the environment at import, so point it at a throwaway
+# ? database before the app is imported. Cached responses would hide queries
+_tmp = tempfile.mkdtemp(prefix='vivilio-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp, 'app.db')
+os.environ['IMAGE_FOLDER_DIR'] = os.path.join(_tmp, 'images')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'null'
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+
+import pytest
+from app import create_app, db, lookups, response_cache, user_cache
+from app.cache import LRUCache
+from app.trending import activity
+from app.models import Category, Genre, Role, Visibility
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def database(app):
+    """Empty tables holding the lookup rows, recreated for every test."""
+    with app.app_context():
+        db.create_all()
+        for model, types in (
+            (Role, ['Creator', 'Admin', 'Member']),
+            (Visibility, ['Public', 'Private']),
+            (Category, ['Books', 'Fiction']),
+            (Genre, ['Fantasy', 'Horror', 'Drama'])
+        ):
+            db.session.add_all(model(type=t) for t in types)
+        db.session.commit()
+
+        yield db
+
+        # ? Write the views counted by the test while its tables still exist
+        activity.flush()
+        db.session.remove()
+        db.drop_all()
+        user_cache.clear()
+        for table in (lookups.roles, lookups.visibilities, lookups.categories, lookups.genres):
+            table.refresh()
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An in-process response cache, for the tests about invalidation."""
+    monkeypatch.setattr(response_cache, 'backend', LRUCache())
+    return response_cache.backend
@@ -0,0 +1,26 @@
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Count the SQL statements an engine executes inside a with block.
+
+        with QueryCounter(db.engine) as counter:
+            client.get('/api/communities/1/posts')
+        assert counter.count == 2
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
@@ -0,0 +1,62 @@
+from base64 import b64encode
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import Book, Community, Publish, User, Visibility
+
+
+@pytest.fixture
+def admin(app):
+    credentials = b64encode(f"{app.config['BASIC_AUTH_USERNAME']}:{app.config['BASIC_AUTH_PASSWORD']}".encode())
+    return {'Authorization': f'Basic {credentials.decode()}'}
+
+
+@pytest.fixture
+def author(database):
+    user = User(email='author@example.com', name='Author', password_hash='-', is_author=True)
+    book = Book(title='A book', description='About things')
+    db.session.add_all([user, book])
+    db.session.flush()
+    db.session.add(Publish(user_id=user.id, book_id=book.id))
+    db.session.commit()
+    return {'user': user.id, 'book': book.id, 'headers': {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}}
+
+
+def test_renaming_a_user_refreshes_their_books(client, cache, admin, author):
+    url = f'/api/books/{author["book"]}'
+    assert client.get(url, headers=author['headers']).json['author']['name'] == 'Author'
+
+    response = client.post(
+        f'/admin/user/edit/?id={author["user"]}', headers=admin,
+        data={'email': 'author@example.com', 'name': 'Renamed', 'is_author': 'y'}
+    )
+    assert response.status_code == 302
+
+    assert client.get(url, headers=author['headers']).json['author']['name'] == 'Renamed'
+
+
+def test_deleting_a_book_drops_its_cached_details(client, cache, admin, author):
+    url = f'/api/books/{author["book"]}'
+    assert client.get(url, headers=author['headers']).status_code == 200
+
+    response = client.post('/admin/book/delete/', headers=admin, data={'id': author['book']})
+    assert response.status_code == 302
+
+    assert client.get(url, headers=author['headers']).status_code == 404
+
+
+def test_editing_a_visibility_refreshes_its_community(client, cache, admin, author):
+    community = Community(name='Readers', description='For readers')
+    db.session.add(community)
+    db.session.flush()
+    visibility = Visibility.query.filter_by(type='Public').first()
+    visibility.community_id = community.id
+    db.session.commit()
+
+    url = f'/api/communities/{community.id}'
+    assert client.get(url, headers=author['headers']).json['visibility']['type'] == 'Public'
+
+    response = client.post(f'/admin/visibility/edit/?id={visibility.id}', headers=admin, data={'type': 'Open'})
+    assert response.status_code == 302
+
+    assert client.get(url, headers=author['headers']).json['visibility']['type'] == 'Open'
@@ -0,0 +1,102 @@
+"""The book_stats counters kept by the review endpoints match a rebuild-book-stats recomputation."""
+from datetime import date
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import Book, BookStats, Review, User
+from manage import rebuild_book_stats
+
+
+@pytest.fixture
+def book(app, database):
+    reader = User(email='reader@example.com', name='Reader', password_hash='-')
+    book = Book(title='A book', description='About things')
+    db.session.add_all([reader, book])
+    db.session.commit()
+
+    return {
+        'id': book.id,
+        'reader': reader.id,
+        'headers': {'Authorization': f'Bearer {create_access_token(identity=reader.id)}'}
+    }
+
+
+def review(started, finished, overview='Good'):
+    return {'overview': overview, 'content': 'A book', 'star': 4, 'started': started, 'finished': finished}
+
+
+def add_undated_review(book):
+    # ? Reviews without dates only come from outside the API, e.g. older rows or the admin
+    undated = Review(book_id=book['id'], user_id=book['reader'], overview='Fine', content='No dates', star=2)
+    db.session.add(undated)
+    BookStats.apply(book['id'], after=BookStats.contribution(undated))
+    db.session.commit()
+    return undated.id
+
+
+def assert_counters_are_current(app):
+    result = app.test_cli_runner().invoke(rebuild_book_stats, ['--check'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('0 of '), result.output
+
+
+def statistics(client, book):
+    return client.get(f'/api/books/{book["id"]}/statistics', headers=book['headers']).json
+
+
+def test_create_counts_only_dated_reviews_in_the_duration(app, client, book):
+    url = f'/api/books/{book["id"]}/reviews'
+    assert client.post(url, headers=book['headers'], json=review('2021-01-01', '2021-01-11')).status_code == 201
+    assert client.post(url, headers=book['headers'], json=review('2021-01-01', '2021-01-31')).status_code == 201
+    add_undated_review(book)
+
+    stats = BookStats.query.get(book['id'])
+    assert (stats.review_count, stats.dated_count, stats.duration_sum) == (3, 2, 40)
+    assert statistics(client, book)['avg_duration_to_finish'] == 20
+    assert_counters_are_current(app)
+
+
+def test_edit_moves_the_duration(app, client, book):
+    url = f'/api/books/{book["id"]}/reviews'
+    client.post(url, headers=book['headers'], json=review('2021-01-01', '2021-01-11'))
+    review_id = Review.query.filter_by(book_id=book['id']).one().id
+    add_undated_review(book)
+
+    response = client.put(f'{url}/{review_id}', headers=book['headers'], json=review('2021-01-01', '2021-01-31'))
+    assert response.status_code == 201
+
+    stats = BookStats.query.get(book['id'])
+    assert (stats.review_count, stats.dated_count, stats.duration_sum) == (2, 1, 30)
+    assert statistics(client, book)['avg_duration_to_finish'] == 30
+    assert_counters_are_current(app)
+
+
+def test_delete_removes_the_duration(app, client, book):
+    url = f'/api/books/{book["id"]}/reviews'
+    client.post(url, headers=book['headers'], json=review('2021-01-01', '2021-01-11'))
+    client.post(url, headers=book['headers'], json=review('2021-01-01', '2021-01-31'))
+    undated_id = add_undated_review(book)
+    dated_id = Review.query.filter(Review.book_id == book['id'], Review.started.isnot(None)).first().id
+
+    assert client.delete(f'{url}/{dated_id}', headers=book['headers']).status_code == 200
+    assert client.delete(f'{url}/{undated_id}', headers=book['headers']).status_code == 200
+
+    stats = BookStats.query.get(book['id'])
+    assert (stats.review_count, stats.dated_count, stats.duration_sum) == (1, 1, 30)
+    assert statistics(client, book)['avg_duration_to_finish'] == 30
+    assert_counters_are_current(app)
+
+
+def test_rebuild_restores_the_dated_count(app, client, book):
+    client.post(f'/api/books/{book["id"]}/reviews', headers=book['headers'], json=review('2021-01-01', '2021-01-11'))
+    add_undated_review(book)
+    BookStats.query.get(book['id']).dated_count = 0
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(rebuild_book_stats)
+    assert result.exit_code == 0, result.output
+    assert 'Rebuilt statistics for 1 books.' in result.output
+
+    db.session.expire_all()
+    assert BookStats.query.get(book['id']).dated_count == 1
+    assert_counters_are_current(app)
@@ -0,0 +1,21 @@
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import Book, Publish, User
+
+
+def test_deleted_book_is_not_served_from_cache(client, cache):
+    author = User(email='author@example.com', name='Author', password_hash='-', is_author=True)
+    book = Book(title='A book', description='About things', cover='cover.png')
+    db.session.add_all([author, book])
+    db.session.flush()
+    db.session.add(Publish(user_id=author.id, book_id=book.id))
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=author.id)}'}
+
+    assert client.get(f'/api/books/{book.id}', headers=headers).status_code == 200
+    assert len(client.get(f'/api/users/{author.id}/books', headers=headers).json['books']) == 1
+
+    assert client.delete(f'/api/books/{book.id}', headers=headers).status_code == 200
+
+    assert client.get(f'/api/books/{book.id}', headers=headers).status_code == 404
+    assert client.get(f'/api/users/{author.id}/books', headers=headers).json['books'] == []
@@ -0,0 +1,69 @@
+import json
+import pytest
+from PIL import Image
+from app import db
+from app.catalog import CatalogImport, read_records
+from app.models import Book, User
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join([
+        '{"title": "First"}',
+        '{"title": "Broken"',
+        '',
+        '["not", "an", "object"]',
+        '{"title": "Last"}'
+    ]), encoding='utf-8')
+    return str(path)
+
+
+def test_unreadable_lines_are_skipped(catalog):
+    errors = []
+
+    records = list(read_records(catalog, lambda number, reason: errors.append((number, reason))))
+
+    assert [r['title'] for r in records] == ['First', 'Last']
+    assert errors == [(2, 'malformed JSON'), (4, 'not a JSON object')]
+
+
+def test_unreadable_lines_raise_without_a_callback(catalog):
+    with pytest.raises(ValueError, match='Line 2'):
+        list(read_records(catalog))
+
+
+@pytest.fixture
+def covers(tmp_path):
+    folder = tmp_path / 'covers'
+    folder.mkdir()
+    Image.new('RGB', (8, 8)).save(folder / 'cover.png')
+    return str(folder)
+
+
+def test_records_of_the_wrong_shape_are_skipped(app, database, covers, tmp_path):
+    db.session.add(User(email='author@example.com', name='Author', password_hash='-', is_author=True))
+    db.session.commit()
+    good = {'title': 'Good', 'description': 'Fine', 'cover': 'cover.png', 'publisher': 'author@example.com'}
+
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join(json.dumps(line) for line in [
+        good,
+        {**good, 'title': 42},
+        {**good, 'description': ['Fine']},
+        {**good, 'cover': {'file': 'cover.png'}},
+        {**good, 'publisher': 7},
+        {**good, 'genres': 'Fiction'},
+        {**good, 'genres': ['Fiction', 3]},
+        {**good, 'genres': {'Fiction': True}},
+        [good],
+        'Good',
+    ]), encoding='utf-8')
+
+    job = CatalogImport(covers)
+    job.run(list(read_records(str(path), job.skip_line)))
+    job.run([[good], None, 'Good'])
+
+    assert job.imported == 2
+    assert job.skipped == {'invalid record': 9, 'not a JSON object': 2}
+    assert [book.title for book in Book.query.order_by(Book.id)] == ['Good', 'Good']
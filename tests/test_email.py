@@ -0,0 +1,141 @@
+import socketserver
+import threading
+import time
+import pytest
+from flask import Flask
+from flask_mail import Message
+from config import Config
+from app import mail
+from app.email import MailQueue
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    def write(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            drop = server.connections <= server.drop
+
+        if drop:
+            self.write('421 Service not available, closing transmission channel')
+            return
+
+        self.write('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line.decode().strip().split(' ', 1)[0].upper()
+            if command == 'DATA':
+                self.write('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.write('250 OK')
+            elif command == 'QUIT':
+                self.write('221 Bye')
+                return
+            else:
+                self.write('250 OK')
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """SMTP server accepting everything, except the first `drop` connections it answers with a 421."""
+
+    daemon_threads = True
+
+    def __init__(self, drop=0):
+        super().__init__(('127.0.0.1', 0), StubSMTPHandler)
+        self.drop = drop
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def smtp_server():
+    server = StubSMTPServer(drop=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mail_app(smtp_server):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=smtp_server.server_address[1],
+        MAIL_USE_TLS=False,
+        MAIL_USERNAME=None,
+        MAIL_PASSWORD=None,
+        MAIL_WORKERS=2,
+        MAIL_RETRY_BACKOFF=0.01,
+        MAIL_IDLE_TIMEOUT=0.5
+    )
+    mail.init_app(app)
+    return app
+
+
+def message(i, recipients=('reader@example.com',)):
+    return Message(f'Message {i}', sender='no-reply@example.com', recipients=list(recipients), body='Hello')
+
+
+def wait(queue, timeout=10):
+    deadline = time.monotonic() + timeout
+    while queue.queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not queue.queue.unfinished_tasks
+
+
+def test_sends_everything_over_reused_connections(mail_app, smtp_server):
+    queue = MailQueue()
+
+    with mail_app.app_context():
+        for i in range(200):
+            queue.put(message(i))
+
+    wait(queue)
+
+    assert queue.stats()['sent'] == 200
+    assert queue.stats()['failed'] == 0
+    assert smtp_server.messages == 200
+    # ? One connection per worker, plus the one dropped with a 421
+    assert smtp_server.connections <= mail_app.config['MAIL_WORKERS'] + 1
+
+
+def test_bad_message_does_not_kill_the_workers(mail_app, smtp_server):
+    queue = MailQueue()
+
+    with mail_app.app_context():
+        for i in range(mail_app.config['MAIL_WORKERS']):
+            queue.put(message(i, recipients=()))
+        queue.put(message('after'))
+
+    wait(queue)
+
+    assert queue.stats()['failed'] == mail_app.config['MAIL_WORKERS']
+    assert queue.stats()['sent'] == 1
+    assert all(worker.is_alive() for worker in queue.workers)
+
+
+def test_start_replaces_dead_workers(mail_app):
+    queue = MailQueue()
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    queue.workers = [dead]
+
+    queue.start(mail_app)
+
+    assert dead not in queue.workers
+    assert len(queue.workers) == mail_app.config['MAIL_WORKERS']
+    assert all(worker.is_alive() for worker in queue.workers)
@@ -0,0 +1,38 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import exc, text
+from app import db, instrumentation
+from app.models import User
+
+
+def test_failed_statements_are_timed(app, database):
+    with app.test_request_context('/api/books/1'):
+        instrumentation.start_request()
+        timer = instrumentation.current_timer()
+
+        with pytest.raises(exc.OperationalError):
+            db.session.execute(text('SELECT * FROM missing'))
+        db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+
+        assert timer.queries == 2
+        assert timer.db_time > 0
+
+
+def test_api_responses_carry_server_timing(app, client):
+    user = User(email='reader@example.com', name='Reader', password_hash='-')
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=user.id)
+
+    response = client.get('/api/books/trending', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers['Server-Timing']
+    assert 'api.book_trending' in instrumentation.request_metrics.stats()
+
+
+def test_other_blueprints_are_not_timed(app, client):
+    client.get('/admin/')
+
+    assert all(endpoint.startswith('api.') for endpoint in instrumentation.request_metrics.stats())
@@ -0,0 +1,94 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.api.pagination import encode_cursor
+from app.models import Book, Review, User
+
+
+@pytest.fixture
+def book(database):
+    reader = User(email='reader@example.com', name='Reader', password_hash='-')
+    book = Book(title='A book', description='About things')
+    db.session.add_all([reader, book])
+    db.session.flush()
+    db.session.add_all([
+        Review(book_id=book.id, user_id=reader.id, overview=f'Review {i}', content='A book', star=3)
+        for i in range(5)
+    ])
+    db.session.commit()
+
+    return {
+        'url': f'/api/books/{book.id}/reviews',
+        'headers': {'Authorization': f'Bearer {create_access_token(identity=reader.id)}'}
+    }
+
+
+def page(client, book, **args):
+    return client.get(book['url'], query_string=args, headers=book['headers'])
+
+
+def overviews(response):
+    return [review['overview'] for review in response.json['reviews']]
+
+
+def test_first_page(client, book):
+    response = page(client, book, limit=2)
+
+    assert response.status_code == 200
+    assert overviews(response) == ['Review 0', 'Review 1']
+    assert response.json['next_cursor']
+
+
+def test_next_page(client, book):
+    cursor = page(client, book, limit=2).json['next_cursor']
+    response = page(client, book, limit=2, cursor=cursor)
+
+    assert response.status_code == 200
+    assert overviews(response) == ['Review 2', 'Review 3']
+
+
+def test_last_page_has_no_cursor(client, book):
+    cursor = page(client, book, limit=4).json['next_cursor']
+    response = page(client, book, limit=4, cursor=cursor)
+
+    assert overviews(response) == ['Review 4']
+    assert response.json['next_cursor'] is None
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_limit_below_one(client, book, limit):
+    response = page(client, book, limit=limit)
+
+    assert response.status_code == 400
+    assert response.json['message'] == 'Limit must be a positive integer.'
+
+
+@pytest.mark.parametrize('cursor', ['garbage', '!!!', encode_cursor({'id': 1}), encode_cursor([1, 2])])
+def test_garbage_cursor(client, book, cursor):
+    response = page(client, book, cursor=cursor)
+
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid cursor.'
+
+
+@pytest.mark.parametrize('values', [['1'], [1.5], [True], [None], [[1]]])
+def test_wrongly_typed_cursor(client, book, values):
+    response = page(client, book, cursor=encode_cursor(values))
+
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid cursor.'
+
+
+@pytest.mark.parametrize('values, status', [
+    ([-1.5, 1], 200),
+    ([2, 1], 200),
+    (['-1.5', 1], 400),
+    ([-1.5, 1.0], 400),
+    ([None, 1], 400),
+])
+def test_ranked_cursor_types(client, book, values, status):
+    response = client.get(
+        '/api/search/users', query_string={'query': 'Reader', 'cursor': encode_cursor(values)}, headers=book['headers']
+    )
+
+    assert response.status_code == status
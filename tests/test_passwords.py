@@ -0,0 +1,76 @@
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db, user_cache
+from app.models import User
+from app.passwords import PasswordHasher, PasswordPoolBusy
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def hasher(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_PROCESSES', 1)
+    hasher = PasswordHasher()
+    with app.app_context():
+        yield hasher
+    if hasher._pool:
+        hasher._pool.shutdown()
+
+
+def test_replaces_a_broken_pool(hasher):
+    pwhash = hasher.hash('secret1')
+    broken = hasher._pool
+
+    with pytest.raises(PasswordPoolBusy):
+        hasher._run(crash)
+
+    assert hasher._pool is not broken
+    assert hasher.check(pwhash, 'secret1')
+
+
+@pytest.fixture
+def inline_hashing(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_PROCESSES', 0)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    # ? validate_mail checks the domain's deliverability, which needs DNS
+    monkeypatch.setattr('app.utils.email_validator.validate_email', lambda email: email)
+
+
+@pytest.fixture
+def reader(database, inline_hashing):
+    user = User(email='reader@example.com', name='Reader')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_cached_user_leaves_the_hash_out(client, reader):
+    headers = {'Authorization': f'Bearer {create_access_token(identity=reader)}'}
+    assert client.get('/api/users/me', headers=headers).status_code == 200
+
+    cached = user_cache.get(reader)
+    assert cached['email'] == 'reader@example.com'
+    assert 'password_hash' not in cached
+
+
+def test_hash_loads_on_demand(app, client, reader):
+    credentials = {'email': 'reader@example.com', 'password': 'secret1'}
+
+    assert client.post('/api/auth', json=credentials).status_code == 200
+    assert client.post('/api/auth', json={**credentials, 'password': 'secret2'}).status_code == 400
+
+    db.session.expire_all()
+    assert User.query.get(reader).check_password('secret1')
+
+
+def test_sign_in_rehashes_with_a_deferred_hash(app, client, reader, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+
+    assert client.post('/api/auth', json={'email': 'reader@example.com', 'password': 'secret1'}).status_code == 200
+
+    db.session.expire_all()
+    assert User.query.get(reader).password_hash.startswith('pbkdf2:sha256:2000$')
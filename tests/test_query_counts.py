@@ -0,0 +1,128 @@
+"""The list endpoints run the same number of SQL statements for 5 rows as for 50."""
+from datetime import date, datetime
+from itertools import count
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db, lookups
+from app.models import Book, BookGenre, BookTrending, Comment, Community, Genre, Membership, Post, Publish, Review, User
+from tests.helpers import QueryCounter
+
+SMALL, LARGE = 5, 50
+
+_ids = count(1)
+
+
+def new_user():
+    n = next(_ids)
+    user = User(email=f'user{n}@example.com', name=f'User {n}', password_hash='-')
+    db.session.add(user)
+    return user
+
+
+@pytest.fixture
+def world(app, database):
+    reader = new_user()
+    author = new_user()
+    author.is_author = True
+    community = Community(name='Readers', description='For readers')
+    book = Book(title='A book', description='About things')
+    db.session.add_all([community, book])
+    db.session.flush()
+
+    post = Post(content='First', author_id=author.id, community_id=community.id)
+    db.session.add_all([post, Publish(user_id=author.id, book_id=book.id)])
+    db.session.commit()
+
+    return {
+        'reader': reader.id,
+        'community': community.id,
+        'post': post.id,
+        'book': book.id,
+        'token': create_access_token(identity=reader.id)
+    }
+
+
+def add_joined(world, n):
+    for _ in range(n):
+        community = Community(name=f'Community {next(_ids)}', description='Joined')
+        db.session.add(community)
+        db.session.flush()
+        db.session.add(Membership(user_id=world['reader'], community_id=community.id, role_id=lookups.roles.get('Member')))
+
+
+def add_posts(world, n):
+    for _ in range(n):
+        db.session.add(Post(content='Hello', author=new_user(), community_id=world['community']))
+
+
+def add_comments(world, n):
+    for _ in range(n):
+        db.session.add(Comment(content='Indeed', author=new_user(), post_id=world['post']))
+
+
+def add_members(world, n):
+    for _ in range(n):
+        db.session.add(Membership(profile=new_user(), community_id=world['community'], role_id=lookups.roles.get('Member')))
+
+
+def add_genres(world, n):
+    for _ in range(n):
+        genre = Genre(type=f'Genre {next(_ids)}')
+        db.session.add(genre)
+        db.session.flush()
+        db.session.add(BookGenre(book_id=world['book'], genre_id=genre.id))
+
+
+def add_reviews(world, n):
+    for _ in range(n):
+        db.session.add(Review(
+            book_id=world['book'], author=new_user(), overview='Good', content='A good book',
+            star=4, started=date(2021, 1, 1), finished=date(2021, 2, 1)
+        ))
+
+
+def add_trending(world, n):
+    rank = BookTrending.query.count()
+    for i in range(n):
+        book = Book(title=f'Book {next(_ids)}', description='Trending')
+        db.session.add(book)
+        db.session.flush()
+        db.session.add(BookTrending(book_id=book.id, rank=rank + i + 1, score=1.0 / (rank + i + 1), computed_at=datetime.utcnow()))
+
+
+LIST_ENDPOINTS = [
+    ('/api/communities/joined', add_joined),
+    ('/api/communities/{community}/posts', add_posts),
+    ('/api/communities/{community}/posts/{post}/comments', add_comments),
+    ('/api/communities/{community}/members', add_members),
+    ('/api/books/{book}/genres', add_genres),
+    ('/api/books/{book}/reviews', add_reviews),
+    ('/api/books/trending', add_trending),
+]
+
+
+def statements(client, world, path):
+    url = path.format(**world) + '?limit=100'
+    headers = {'Authorization': f'Bearer {world["token"]}'}
+
+    # ? Warm the per worker caches (user, lookups) so only the page itself is counted
+    assert client.get(url, headers=headers).status_code == 200
+
+    with QueryCounter(db.engine) as counter:
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    return counter
+
+
+@pytest.mark.parametrize('path, add_rows', LIST_ENDPOINTS, ids=[path for path, _ in LIST_ENDPOINTS])
+def test_statement_count_does_not_grow_with_rows(client, world, path, add_rows):
+    add_rows(world, SMALL)
+    db.session.commit()
+    small = statements(client, world, path)
+
+    add_rows(world, LARGE - SMALL)
+    db.session.commit()
+    large = statements(client, world, path)
+
+    assert large.count == small.count, '\n\n'.join(large.statements)
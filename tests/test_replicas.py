@@ -0,0 +1,112 @@
+import shutil
+import sqlite3
+import time
+import pytest
+from flask import g, make_response
+from flask_jwt_extended import create_access_token
+from app import create_app, db, user_cache
+from app.database import ReplicaRouter, replicas
+from app.models import User
+from config import Config
+
+
+@pytest.fixture
+def router(app):
+    router = ReplicaRouter()
+    router.keys = ['replica_0']
+    return router
+
+
+def route(app, router, headers=None):
+    with app.test_request_context('/api/books/1', headers=headers):
+        router.route()
+        return g.db_replica
+
+
+def test_reads_go_to_a_replica(app, router):
+    assert route(app, router) == 'replica_0'
+
+
+def test_writes_pin_the_client_to_the_primary(app, router):
+    with app.test_request_context('/api/books/1', method='PUT'):
+        response = router.pin(make_response('', 200))
+
+    until = response.headers[ReplicaRouter.PIN_HEADER]
+    assert float(until) > time.time()
+    assert f'{ReplicaRouter.PIN_COOKIE}={until}' in response.headers['Set-Cookie']
+
+    assert route(app, router, {ReplicaRouter.PIN_HEADER: until}) is None
+    assert route(app, router, {'Cookie': f'{ReplicaRouter.PIN_COOKIE}={until}'}) is None
+    assert router.stats()['pinned'] == 2
+
+
+def test_expired_or_invalid_pins_are_ignored(app, router):
+    assert route(app, router, {ReplicaRouter.PIN_HEADER: str(time.time() - 1)}) == 'replica_0'
+    assert route(app, router, {ReplicaRouter.PIN_HEADER: 'soon'}) == 'replica_0'
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """An app reading from the given replica URLs, primary and replica_0 being SQLite files."""
+    primary = f'sqlite:///{tmp_path}/primary.db'
+    replica = f'sqlite:///{tmp_path}/replica.db'
+    # ? create_app configures the module level router, restore it for the other tests
+    monkeypatch.setattr(replicas, 'keys', replicas.keys)
+    monkeypatch.setattr(replicas, '_down', {})
+
+    def make(*urls):
+        class ReplicaConfig(Config):
+            SQLALCHEMY_DATABASE_URI = primary
+            SQLALCHEMY_BINDS = {f'replica_{i}': url.format(replica=replica) for i, url in enumerate(urls)}
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+
+        app = create_app(ReplicaConfig)
+        with app.app_context():
+            db.create_all(bind=None)
+            user = User(email='reader@example.com', name='Primary', password_hash='-')
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=user.id)
+            db.session.remove()
+
+        # ? The replica is a copy lagging behind: same rows, another name
+        shutil.copy(f'{tmp_path}/primary.db', f'{tmp_path}/replica.db')
+        connection = sqlite3.connect(f'{tmp_path}/replica.db')
+        connection.execute("UPDATE users SET name = 'Replica'")
+        connection.commit()
+        connection.close()
+
+        return app, user.id, {'Authorization': f'Bearer {token}'}
+
+    yield make
+    user_cache.clear()
+
+
+def test_reads_without_a_pin_use_the_replica(replica_app):
+    app, user_id, headers = replica_app('{replica}')
+
+    response = app.test_client().get(f'/api/users/{user_id}', headers=headers)
+
+    assert response.status_code == 200
+    assert response.json['name'] == 'Replica'
+
+
+def test_reads_after_a_write_see_it_on_the_primary(replica_app):
+    app, user_id, headers = replica_app('{replica}')
+    writer, other = app.test_client(), app.test_client()
+
+    assert writer.put('/api/users/me', headers=headers, json={'name': 'Renamed'}).status_code == 200
+
+    assert writer.get(f'/api/users/{user_id}', headers=headers).json['name'] == 'Renamed'
+    # ? Without the pin the replica, which never saw the write, still answers
+    assert other.get(f'/api/users/{user_id}', headers=headers).json['name'] == 'Replica'
+
+
+def test_unreachable_replica_falls_back_to_the_primary(replica_app):
+    app, user_id, headers = replica_app('sqlite:////nonexistent/dir/replica.db')
+
+    response = app.test_client().get(f'/api/users/{user_id}', headers=headers)
+
+    assert response.status_code == 200
+    assert response.json['name'] == 'Primary'
+    assert replicas.stats()['replicas'] == {'replica_0': 'down'}
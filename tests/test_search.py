@@ -0,0 +1,50 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.fulltext import PostgresSearch
+from app.models import User
+
+
+@pytest.fixture(params=['sqlite', 'like'])
+def backend(request, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SEARCH_BACKEND', request.param)
+    return request.param
+
+
+@pytest.fixture
+def headers(database):
+    users = [
+        User(email='ada.lovelace@example.com', name='Ada Lovelace', password_hash='-'),
+        User(email='foo@gmail.com', name='Foo Bar', password_hash='-'),
+        User(email='grace@navy.mil', name='Grace Hopper', password_hash='-'),
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=users[0].id)}'}
+
+
+def search_users(client, headers, query):
+    response = client.get('/api/search/users', query_string={'query': query}, headers=headers)
+    assert response.status_code == 200
+    return [user['email'] for user in response.json['users']]
+
+
+def test_name_prefix(client, backend, headers):
+    assert search_users(client, headers, 'Lovel') == ['ada.lovelace@example.com']
+
+
+def test_exact_email(client, backend, headers):
+    assert search_users(client, headers, 'foo@gmail.com') == ['foo@gmail.com']
+
+
+def test_no_match(client, backend, headers):
+    assert search_users(client, headers, 'Turing') == []
+
+
+def test_postgres_also_matches_the_query_as_parsed(app):
+    with app.app_context():
+        users, _ = PostgresSearch().match(User, 'foo@gmail.com')
+        sql = str(users.statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+    assert "to_tsquery('simple', 'foo:* & gmail:* & com:*') || plainto_tsquery('simple', 'foo@gmail.com')" in sql
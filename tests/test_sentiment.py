@@ -0,0 +1,65 @@
+import pytest
+from app import db
+from app.analytics import sentiment
+from app.models import Book, Review, User
+from manage import backfill_sentiment
+
+OVERVIEWS = ['Loved it', 'Terrible book', 'It is a book', 'Great and moving', 'Boring and bad', 'Fine']
+
+
+@pytest.fixture
+def reviews(database):
+    reader = User(email='reader@example.com', name='Reader', password_hash='-')
+    book = Book(title='A book', description='About things')
+    db.session.add_all([reader, book])
+    db.session.flush()
+    db.session.add_all([
+        Review(book_id=book.id, user_id=reader.id, overview=OVERVIEWS[i % len(OVERVIEWS)], content='A book', star=3)
+        for i in range(30)
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def pool_calls(monkeypatch):
+    calls = []
+    get_pool = sentiment.get_pool
+    monkeypatch.setattr(sentiment, 'get_pool', lambda processes: calls.append(processes) or get_pool(processes))
+    yield calls
+    if sentiment._pool:
+        sentiment._pool.shutdown()
+        sentiment._pool = None
+
+
+def backfill(app):
+    Review.query.update({Review.sentiment: None})
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(backfill_sentiment, ['--batch-size', '4'])
+    assert result.output == 'Backfilled sentiment for 30 reviews.\n', result.output
+
+    db.session.expire_all()
+    return [review.sentiment for review in Review.query.order_by(Review.id)]
+
+
+def test_pool_and_serial_backfills_agree(app, reviews, pool_calls, monkeypatch):
+    monkeypatch.setitem(app.config, 'SENTIMENT_POOL_THRESHOLD', 10)
+
+    monkeypatch.setitem(app.config, 'SENTIMENT_PROCESSES', 0)
+    serial = backfill(app)
+    assert pool_calls == []
+
+    # ? 30 reviews to backfill reach the threshold even though each batch holds 4
+    monkeypatch.setitem(app.config, 'SENTIMENT_PROCESSES', 2)
+    pooled = backfill(app)
+    assert pool_calls
+
+    assert pooled == serial
+    assert None not in serial and len(set(serial)) > 1
+
+
+def test_small_backlog_stays_serial(app, reviews, pool_calls, monkeypatch):
+    monkeypatch.setitem(app.config, 'SENTIMENT_PROCESSES', 2)
+
+    assert len(backfill(app)) == 30
+    assert pool_calls == []